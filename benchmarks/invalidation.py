@@ -0,0 +1,41 @@
+"""Measure how the cost of invalidation scales with the size of the
+invalidated cone.
+
+Each graph is a VarNode feeding a fan-out of AddNodes, half of which
+feed a second layer of AddNodes. After evaluating every node, the
+VarNode is changed, which invalidates the whole graph.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from lameflow import *
+
+
+def build(width):
+    var = VarNode(0)
+    first = [AddNode(var, ConstNode(i)) for i in range(width)]
+    second = [AddNode(a, b) for a, b in zip(first[::2], first[1::2])]
+    return var, first + second
+
+
+def time_invalidation(width, repeat=5):
+    var, nodes = build(width)
+    best = float("inf")
+    for i in range(repeat):
+        for node in nodes:
+            node.value
+        start = time.perf_counter()
+        var.value = i + 1
+        best = min(best, time.perf_counter() - start)
+    return len(nodes) + 1, best
+
+
+if __name__ == "__main__":
+    print(f"{'cone size':>10} {'seconds':>10} {'ns/node':>10}")
+    for width in (1_000, 10_000, 100_000, 300_000):
+        size, seconds = time_invalidation(width)
+        print(f"{size:>10} {seconds:>10.4f} {seconds / size * 1e9:>10.1f}")
@@ -0,0 +1,85 @@
+"""Measure the cost of creating a Node, both when an equal Node is
+already memoized (a hit) and when a new Node must be created (a miss).
+
+For reference, the cost of a single dict lookup with a tuple key is
+also shown.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from lameflow import *
+
+
+@nodeclass
+class KeywordNode(Node):
+    """A Node whose arguments are passed by keyword."""
+
+
+def best_of(func, n, repeat=5):
+    """Return the best time per call of func over n calls, each
+    repetition starting from an empty Graph.
+    """
+
+    best = float("inf")
+    for _ in range(repeat):
+        with Graph():
+            start = time.perf_counter()
+            func(n)
+            best = min(best, time.perf_counter() - start)
+    return best / n
+
+
+def dict_lookup(n):
+    table = {(AddNode, (1, 2)): None}
+    for _ in range(n):
+        table.get((AddNode, (1, 2)))
+
+
+def const_hit(n):
+    ConstNode(0)
+    for _ in range(n):
+        ConstNode(0)
+
+
+def add_hit(n):
+    a, b = VarNode(0), VarNode(1)
+    AddNode(a, b)
+    for _ in range(n):
+        AddNode(a, b)
+
+
+def kwargs_hit(n):
+    a, b = VarNode(0), VarNode(1)
+    KeywordNode(a=a, b=b)
+    for _ in range(n):
+        KeywordNode(a=a, b=b)
+
+
+def const_miss(n):
+    for i in range(n):
+        ConstNode(i)
+
+
+def add_miss(n):
+    a = VarNode(0)
+    consts = [ConstNode(i) for i in range(n)]
+    for const in consts:
+        AddNode(a, const)
+
+
+if __name__ == "__main__":
+    n = 100_000
+    print(f"{'case':>12} {'ns/call':>10}")
+    for name, func in [
+            ("dict lookup", dict_lookup),
+            ("const hit", const_hit),
+            ("add hit", add_hit),
+            ("kwargs hit", kwargs_hit),
+            ("const miss", const_miss),
+            ("add miss", add_miss)]:
+        seconds = best_of(func, n)
+        print(f"{name:>12} {seconds * 1e9:>10.1f}")
@@ -0,0 +1,42 @@
+"""Measure the memory used per Node.
+
+Each graph is a VarNode feeding AddNodes of the VarNode and a ConstNode,
+so that every AddNode is a small node that just adds two numbers. The
+memory allocated while building and evaluating the graph is divided by
+the number of Nodes created.
+"""
+
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from lameflow import *
+
+
+def build(width):
+    var = VarNode(0)
+    nodes = [AddNode(var, ConstNode(i)) for i in range(width)]
+    for node in nodes:
+        node.value
+    return var, nodes
+
+
+def bytes_per_node(width):
+    with Graph() as graph:
+        gc.collect()
+        tracemalloc.start()
+        start, _ = tracemalloc.get_traced_memory()
+        var, nodes = build(width)
+        end, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return len(graph.memo), (end - start) / len(graph.memo)
+
+
+if __name__ == "__main__":
+    print(f"{'nodes':>10} {'bytes/node':>12}")
+    for width in (1_000, 10_000, 100_000):
+        count, size = bytes_per_node(width)
+        print(f"{count:>10} {size:>12.1f}")
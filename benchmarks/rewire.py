@@ -0,0 +1,40 @@
+"""Measure how the cost of replacing the arguments of a Node scales with
+the number of arguments.
+
+An AddNode of n VarNodes has its arguments replaced by n other VarNodes,
+then by a list differing from the current arguments in one element.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from lameflow import *
+
+
+def time_rewire(n):
+    with Graph():
+        variables = [VarNode(i) for i in range(2 * n)]
+        node = AddNode(*variables[:n])
+        node.value
+
+        start = time.perf_counter()
+        node.args = variables[n:]
+        replace_all = time.perf_counter() - start
+
+        node.value
+        new_args = list(node.args)
+        new_args[n // 2] = variables[0]
+        start = time.perf_counter()
+        node.args = new_args
+        replace_one = time.perf_counter() - start
+        return replace_all, replace_one
+
+
+if __name__ == "__main__":
+    print(f"{'args':>10} {'replace all':>12} {'replace one':>12}")
+    for n in (1_000, 10_000, 100_000):
+        replace_all, replace_one = time_rewire(n)
+        print(f"{n:>10} {replace_all:>12.4f} {replace_one:>12.4f}")
@@ -0,0 +1,219 @@
+"""Measure each phase of the life of a graph, for several graph shapes.
+
+The phases are:
+
+- build: creating every Node.
+- cold: computing the outputs for the first time.
+- warm: reading the outputs again, when every Node is valid.
+- update: changing one input, then reading the outputs.
+- bulk: changing every input in one Batch, then reading the outputs.
+
+Each phase is timed with a fresh Graph and the best of several
+repetitions is kept. The peak memory allocated while building the
+graph and computing it cold is measured separately with tracemalloc,
+which slows down the code it traces.
+
+Run with --json to print the results as JSON, for comparison between
+releases, and with --lazy to use lazily invalidated Graphs.
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from lameflow import *
+
+
+# Each shape builds a graph of about size Nodes in the current Graph,
+# and returns its input VarNodes and output Nodes.
+
+def chain(size):
+    """A single chain of AddNodes, each depending on the previous one."""
+
+    var = VarNode(0)
+    node = var
+    for _ in range(size):
+        node = AddNode(node, ConstNode(1))
+    return [var], [node]
+
+
+def fan_in(size):
+    """One AddNode of many VarNodes."""
+
+    inputs = [VarNode(i) for i in range(size)]
+    return inputs, [AddNode(*inputs)]
+
+
+def diamond(size):
+    """A square lattice of AddNodes, each depending on two neighbouring
+    Nodes of the previous layer.
+    """
+
+    width = max(2, int(size ** 0.5))
+    inputs = [VarNode(i) for i in range(width)]
+    layer = inputs
+    for _ in range(width):
+        layer = [AddNode(layer[i], layer[(i + 1) % width])
+                for i in range(width)]
+    return inputs, layer
+
+
+def fibonacci(size):
+    """The memoized Fibonacci recursion, with two VarNodes as the first
+    two terms.
+    """
+
+    inputs = [VarNode(0), VarNode(1)]
+    terms = list(inputs)
+    for _ in range(size):
+        # The recursion creates each term twice; the second time, the
+        # memoized Node is returned.
+        if len(terms) > 2:
+            AddNode(terms[-2], terms[-3])
+        terms.append(AddNode(terms[-1], terms[-2]))
+    return inputs, [terms[-1]]
+
+
+def random_dag(size, seed=0):
+    """Random AddNodes of one to three earlier Nodes, with every Node
+    nobody depends on as an output.
+    """
+
+    rng = random.Random(seed)
+    inputs = [VarNode(i) for i in range(max(1, size // 20))]
+    nodes = list(inputs)
+    has_dependents = set()
+    for _ in range(size):
+        args = rng.sample(nodes, min(len(nodes), rng.randint(1, 3)))
+        has_dependents.update(args)
+        nodes.append(AddNode(*args))
+    outputs = [n for n in nodes[len(inputs):] if n not in has_dependents]
+    return inputs, outputs
+
+
+SHAPES = {
+    "chain": chain,
+    "fan_in": fan_in,
+    "diamond": diamond,
+    "fibonacci": fibonacci,
+    "random_dag": random_dag,
+}
+
+PHASES = ["build", "cold", "warm", "update", "bulk"]
+
+
+def read(outputs):
+    for node in outputs:
+        node.value
+
+
+def run_phases(shape, size, lazy=False):
+    """Time each phase once in a fresh Graph, and return the seconds
+    taken by each phase and the number of Nodes.
+    """
+
+    times = {}
+    with Graph(lazy=lazy) as graph:
+        start = time.perf_counter()
+        inputs, outputs = shape(size)
+        times["build"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        read(outputs)
+        times["cold"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        read(outputs)
+        times["warm"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        inputs[0].value += 1
+        read(outputs)
+        times["update"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with Batch():
+            for var in inputs:
+                var.value += 1
+        read(outputs)
+        times["bulk"] = time.perf_counter() - start
+
+        return times, len(graph.memo)
+
+
+def peak_memory(shape, size, lazy=False):
+    """Return the peak bytes allocated while building a graph and
+    computing it cold.
+    """
+
+    gc.collect()
+    with Graph(lazy=lazy):
+        tracemalloc.start()
+        try:
+            inputs, outputs = shape(size)
+            read(outputs)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+
+def benchmark(name, size, repeat, lazy=False):
+    best = dict.fromkeys(PHASES, float("inf"))
+    for _ in range(repeat):
+        gc.collect()
+        times, nodes = run_phases(SHAPES[name], size, lazy)
+        for phase in PHASES:
+            best[phase] = min(best[phase], times[phase])
+
+    return {
+        "shape": name,
+        "size": size,
+        "nodes": nodes,
+        "seconds": best,
+        "nodes_per_second": {phase: nodes / seconds if seconds else None
+                for phase, seconds in best.items()},
+        "peak_bytes": peak_memory(SHAPES[name], size, lazy),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--shapes", nargs="+", choices=list(SHAPES),
+            default=list(SHAPES))
+    parser.add_argument("--size", type=int, default=10_000,
+            help="approximate number of Nodes in each graph")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true",
+            help="print the results as JSON")
+    parser.add_argument("--lazy", action="store_true",
+            help="use lazily invalidated Graphs")
+    options = parser.parse_args()
+
+    results = [benchmark(name, options.size, options.repeat, options.lazy)
+            for name in options.shapes]
+
+    if options.json:
+        json.dump({"python": sys.version.split()[0], "lazy": options.lazy,
+                "results": results}, sys.stdout, indent=2)
+        print()
+        return
+
+    print(f"{'shape':>12} {'nodes':>8} "
+            + " ".join(f"{phase + ' s':>10}" for phase in PHASES)
+            + f" {'peak MB':>9}")
+    for result in results:
+        print(f"{result['shape']:>12} {result['nodes']:>8} "
+                + " ".join(f"{result['seconds'][phase]:>10.3g}"
+                        for phase in PHASES)
+                + f" {result['peak_bytes'] / 1e6:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,7 @@ import tempfile
 import time
 
 from lameflow import *
-from lameflow.graphviz import dot_source
+from lameflow.graphviz import DotExporter
 
 
 @nodeclass
@@ -80,7 +80,7 @@ def quadratic_roots(a, b, c):
 
 file_number = 0
 
-def save_svg(event):
+def save_svg(exporter, event):
     global file_number
 
     if isinstance(event, (NodeValueEvent, NodeCallStackEvent)):
@@ -90,14 +90,15 @@ def save_svg(event):
 
     with open(f"{file_number:04}.svg", "w") as svg:
         subprocess.run(["dot", "-Tsvg"],
-                text=True, input=dot_source(), stdout=svg)
+                text=True, input=exporter.source(), stdout=svg)
 
 
 if __name__ == "__main__":
     #NodeEvent.listeners.add(lambda e: print(e, file=sys.stderr))
 
-    #NodeEvent.listeners.add(lambda event: save_svg(event))
-    #quadratic_roots(1, 1, -2)
+    #with DotExporter(on_update=save_svg):
+    #    quadratic_roots(1, 1, -2)
 
     fibonacci(7)
-    save_svg(None)
+    with DotExporter() as exporter:
+        save_svg(exporter, None)
@@ -1,4 +1,12 @@
 from .node import *
+from .compiler import *
 from .core import *
 from .event import *
 from .math import *
+from .memo import *
+from .parallel import *
+from .persist import *
+from .processes import *
+from .profiler import *
+from .scenarios import *
+from .snapshot import *
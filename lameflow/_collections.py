@@ -1,8 +1,9 @@
 """Collections classes with additional functionality."""
 
-__all__ = ["FrozenDict", "ObservableList", "ObservableDict"]
+__all__ = ["FrozenDict", "ObservableList", "ObservableDict", "ObservableSet"]
 
-from collections.abc import Mapping, MutableSequence, MutableMapping
+from collections.abc import (
+        Mapping, MutableSequence, MutableMapping, MutableSet)
 import functools
 import operator
 
@@ -10,6 +11,8 @@ import operator
 class _CollectionWrapper:
     """A class wrapping a collection."""
 
+    __slots__ = ("_data",)
+
     def __init__(self, data):
         self._data = data
 
@@ -17,6 +20,8 @@ class _CollectionWrapper:
 class FrozenDict(Mapping, _CollectionWrapper):
     """A dict which cannot be modified."""
 
+    __slots__ = ("_hash",)
+
     def __init__(self, *args, **kwargs):
         super().__init__(dict(*args, **kwargs))
 
@@ -29,16 +34,30 @@ class FrozenDict(Mapping, _CollectionWrapper):
     def __len__(self):
         return len(self._data)
 
+    def __eq__(self, other):
+        if isinstance(other, FrozenDict):
+            return self._data == other._data
+        return super().__eq__(other)
+
     def __hash__(self):
-        if hasattr(self, "_hash"):
+        try:
+            return self._hash
+        except AttributeError:
+            # Equal dicts may differ in insertion order.
+            self._hash = hash(frozenset(self._data.items()))
             return self._hash
-        self._hash = hash(tuple(self._data.items()))
-        return self._hash
+
+    def __reduce__(self):
+        # The cached hash may depend on object identities, so it is not
+        # pickled.
+        return (self.__class__, (self._data,))
 
 
 class _ObservableCollection(_CollectionWrapper):
     """A collection which can be observed for mutations."""
 
+    __slots__ = ("listeners",)
+
     def __init__(self, data):
         super().__init__(data)
         self.listeners = set()
@@ -47,6 +66,8 @@ class _ObservableCollection(_CollectionWrapper):
         return f"{self.__class__.__name__}({self._data})"
 
     def _notify(self, *args):
+        if not self.listeners:
+            return
         mutation = self.__class__.Mutation(*args)
         for listener in self.listeners:
             listener(mutation)
@@ -55,6 +76,8 @@ class _ObservableCollection(_CollectionWrapper):
 class ObservableList(MutableSequence, _ObservableCollection):
     """A list which can be observed for mutations."""
 
+    __slots__ = ()
+
     class Mutation:
         """A mutation to a list.
 
@@ -83,6 +106,9 @@ class ObservableList(MutableSequence, _ObservableCollection):
     def __getitem__(self, key):
         return self._data.__getitem__(key)
 
+    def __iter__(self):
+        return iter(self._data)
+
     def _index_normalize(self, i):
         """If i is negative, return the corresponding index relative to
         the end of the list. Otherwise, return i unchanged.
@@ -92,68 +118,30 @@ class ObservableList(MutableSequence, _ObservableCollection):
         else:
             return len(self) + i
 
-    def _slice_indices(self, s):
-        """Return the indices in a slice of this list.
-
-        The algorithm is explained here:
-        https://docs.python.org/3/library/stdtypes.html#common-sequence-operations
-        """
-
-        if s.step is None:
-            k = 1
-        elif s.step == 0:
-            raise ValueError("Slice step must be a non-zero integer.")
-        else:
-            k = s.step
-
-        i = self._index_normalize(s.start)
-        j = self._index_normalize(s.stop)
-        if k > 0:
-            i = self._slice_lower(i)
-            j = self._slice_upper(j)
-        else:
-            i = self._slice_upper(i, -1)
-            j = self._slice_lower(j, -1)
-
-        index = i
-        indices = []
-        if k > 0:
-            while index < j:
-                indices.append(index)
-                index += k
-        else:
-            while index > j:
-                indices.append(index)
-                index += k
-        return indices
-
-    def _slice_lower(self, i, end_offset=0):
-        if i is None:
-            return 0 + end_offset
-        else:
-            return min(i, len(self) + end_offset)
-
-    def _slice_upper(self, i, end_offset=0):
-        if i is None:
-            return len(self) + end_offset
-        else:
-            return min(i, len(self) + end_offset)
-
     def __setitem__(self, key, value):
         if isinstance(key, slice):
             added = list(value)
             if not _is_extended_slice(key):
+                index = key.indices(len(self))[0]
                 removed = self._data[key]
                 self._data[key] = added
-                self._notify(key.start or 0, removed, added)
+                self._notify(index, removed, added)
             else:
-                indices = self._slice_indices(key)
+                indices = range(*key.indices(len(self)))
                 if len(indices) != len(added):
                     msg = (f"Cannot assign {len(added)} elements to extended "
-                            "slice with {len(indices)} indices.")
+                            f"slice with {len(indices)} indices.")
                     raise ValueError(msg)
-                for index, element in zip(indices, added):
-                    self[index] = element
+                if not indices:
+                    return
+
+                # Report the whole span of the slice as a single
+                # mutation, rather than one mutation per element.
+                start = min(indices[0], indices[-1])
+                stop = max(indices[0], indices[-1]) + 1
+                removed = self._data[start:stop]
+                self._data[key] = added
+                self._notify(start, removed, self._data[start:stop])
         else:
             key = self._index_normalize(int(key))
             old_value = self[key]
@@ -165,15 +153,18 @@ class ObservableList(MutableSequence, _ObservableCollection):
             if not _is_extended_slice(key):
                 self[key] = []
             else:
-                indices = self._slice_indices(key)
-
-                # Remove elements in descending index order (to avoid
-                # shifting elements before they are removed).
-                if key.step > 0:
-                    indices = reversed(indices)
-
-                for index in indices:
-                    del self[index]
+                indices = range(*key.indices(len(self)))
+                if not indices:
+                    return
+
+                # Report the whole span of the slice as a single
+                # mutation, as in __setitem__.
+                start = min(indices[0], indices[-1])
+                stop = max(indices[0], indices[-1]) + 1
+                removed = self._data[start:stop]
+                del self._data[key]
+                self._notify(start, removed,
+                        self._data[start:stop - len(indices)])
         else:
             key = self._index_normalize(key)
             self[key : key + 1] = []
@@ -181,9 +172,59 @@ class ObservableList(MutableSequence, _ObservableCollection):
     def insert(self, index, value):
         self[index:index] = [value]
 
+    def extend(self, values):
+        self[len(self):] = values
+
     def clear(self):
         del self[:]
 
+    def replace(self, iterable):
+        """Replace the contents of this list with the elements of
+        iterable.
+
+        Only the elements between the longest common prefix and suffix
+        of the old and new contents are reported as removed and added,
+        in a single mutation (or none, if nothing changed).
+        """
+
+        index, removed, added = _list_diff(self._data, list(iterable))
+        if removed or added:
+            self[index : index + len(removed)] = added
+
+
+def _list_diff(old, new):
+    """Return (index, removed, added) such that replacing
+    old[index:index + len(removed)] with added turns old into new.
+
+    Elements are compared by identity, and the longest common prefix
+    and suffix of old and new are excluded.
+    """
+
+    limit = min(len(old), len(new))
+    prefix = 0
+    while prefix < limit and old[prefix] is new[prefix]:
+        prefix += 1
+    suffix = 0
+    while (suffix < limit - prefix
+            and old[-1 - suffix] is new[-1 - suffix]):
+        suffix += 1
+    return (prefix, old[prefix : len(old) - suffix],
+            new[prefix : len(new) - suffix])
+
+
+def _dict_diff(old, new):
+    """Return (removed, added) dicts such that removing the keys in
+    removed from old and then updating it with added turns it into new.
+
+    Values are compared by identity, and unchanged items are excluded.
+    """
+
+    removed = {k: v for k, v in old.items()
+            if k not in new or new[k] is not v}
+    added = {k: v for k, v in new.items()
+            if k not in old or old[k] is not v}
+    return removed, added
+
 
 def _is_extended_slice(s):
     """Return whether a slice is an extended slice."""
@@ -194,6 +235,8 @@ def _is_extended_slice(s):
 class ObservableDict(MutableMapping, _ObservableCollection):
     """A dict which can be observed for mutations."""
 
+    __slots__ = ()
+
     class Mutation:
         """A mutation to a dict.
 
@@ -218,7 +261,7 @@ class ObservableDict(MutableMapping, _ObservableCollection):
         return iter(self._data)
 
     def __len__(self):
-        return len(self.data)
+        return len(self._data)
 
     def __getitem__(self, key):
         return self._data[key]
@@ -237,3 +280,79 @@ class ObservableDict(MutableMapping, _ObservableCollection):
         removed = {key: self[key]}
         del self._data[key]
         self._notify(removed, {})
+
+    def update(self, *args, **kwargs):
+        """Update this dict as dict.update does, notifying listeners in
+        a single mutation.
+        """
+
+        new = dict(*args, **kwargs)
+        removed, added = _dict_diff(
+                {k: self._data[k] for k in new if k in self._data}, new)
+        if added:
+            self._data.update(added)
+            self._notify(removed, added)
+
+    def clear(self):
+        if self._data:
+            removed = self._data.copy()
+            self._data.clear()
+            self._notify(removed, {})
+
+    def replace(self, mapping):
+        """Replace the contents of this dict with those of mapping,
+        reporting only the changed items in a single mutation.
+        """
+
+        new = dict(mapping)
+        removed, added = _dict_diff(self._data, new)
+        if removed or added:
+            for key in removed.keys() - added.keys():
+                del self._data[key]
+            self._data.update(added)
+            self._notify(removed, added)
+
+
+class ObservableSet(MutableSet, _ObservableCollection):
+    """A set which can be observed for mutations."""
+
+    __slots__ = ()
+
+    class Mutation:
+        """A mutation to a set.
+
+        Before the mutation:
+            removed <= obs_set and not (added & obs_set)
+
+        After the mutation:
+            added <= obs_set and not (removed & obs_set)
+        """
+
+        def __init__(self, removed, added):
+            self.removed = removed
+            self.added = added
+
+        def __str__(self):
+            return f"removed {self.removed}, added {self.added}"
+
+    def __init__(self, iterable=()):
+        super().__init__(set(iterable))
+
+    def __contains__(self, value):
+        return value in self._data
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def add(self, value):
+        if value not in self._data:
+            self._data.add(value)
+            self._notify(set(), {value})
+
+    def discard(self, value):
+        if value in self._data:
+            self._data.remove(value)
+            self._notify({value}, set())
@@ -0,0 +1,149 @@
+"""Nodes which perform mathematical operations on NumPy arrays.
+
+This module requires NumPy, and is not imported by the lameflow package
+itself.
+"""
+
+__all__ = [
+    "UfuncNode",
+    "ArrayAddNode",
+    "ArraySubNode",
+    "ArrayMulNode",
+    "ArrayDivNode",
+    "ArrayPowNode",
+]
+
+import functools
+import math
+import weakref
+
+import numpy as np
+
+from .node import *
+
+
+@nodeclass
+class UfuncNode(Node):
+    """Apply a binary NumPy ufunc to the values of the arguments,
+    reducing from left to right like the Nodes in lameflow.math.
+
+    Array results are written into preallocated buffers instead of new
+    arrays, so recomputing the Node does not allocate temporaries. Each
+    Node alternates between two buffers, which keeps the previous value
+    intact for comparison with the new one. A buffer is only reused once
+    the array computed into it, and every view of that array, has been
+    freed, so values held elsewhere never change.
+    """
+
+    __slots__ = ("_buffers",)
+
+    ufunc = None
+
+    def __init__(self, *args):
+        self._buffers = []
+        super().__init__(*args)
+
+    def compute_value(self, *args):
+        values = [a.value for a in args]
+        shape = np.broadcast_shapes(*map(np.shape, values))
+        if not shape or len(values) == 1:
+            return functools.reduce(self.ufunc, values)
+
+        out = self._out(shape, self._result_dtype(values))
+        self.ufunc(values[0], values[1], out=out)
+        for value in values[2:]:
+            self.ufunc(out, value, out=out)
+        return out
+
+    def _result_dtype(self, values):
+        """Return the dtype of the result, found by applying the ufunc
+        to empty arrays, which is cheap and follows NumPy's promotion
+        rules exactly.
+        """
+
+        empty = [v.reshape(-1)[:0] if isinstance(v, np.ndarray) else v
+                for v in values]
+        return np.asarray(functools.reduce(self.ufunc, empty)).dtype
+
+    def _out(self, shape, dtype):
+        """Return an array with the given shape and dtype, which is not
+        the current value of this Node, to compute the value into.
+
+        Each buffer is a bytearray, paired with a weak reference to the
+        array viewing it. NumPy makes every view of that array refer to
+        it, rather than to the bytearray, so the buffer is free once the
+        weak reference is dead.
+        """
+
+        if dtype.hasobject:
+            return np.empty(shape, dtype)
+        size = math.prod(shape) * dtype.itemsize
+
+        for i, (buffer, ref) in enumerate(self._buffers):
+            if ref() is None and len(buffer) == size:
+                break
+        else:
+            # Forget the free buffers, which have the wrong size.
+            self._buffers = [entry for entry in self._buffers
+                    if entry[1]() is not None]
+            buffer = bytearray(size)
+            i = len(self._buffers)
+            self._buffers.append(None)
+
+        out = np.ndarray(shape, dtype, buffer=buffer)
+        self._buffers[i] = (buffer, weakref.ref(out))
+        return out
+
+
+@nodeclass
+class ArrayAddNode(UfuncNode):
+    """Compute the sum of the arguments."""
+
+    __slots__ = ()
+
+    ufunc = np.add
+
+
+@nodeclass
+class ArraySubNode(UfuncNode):
+    """Compute the difference of the two arguments."""
+
+    __slots__ = ()
+
+    ufunc = np.subtract
+
+    def compute_value(self, a, b):
+        return super().compute_value(a, b)
+
+
+@nodeclass
+class ArrayMulNode(UfuncNode):
+    """Compute the product of the arguments."""
+
+    __slots__ = ()
+
+    ufunc = np.multiply
+
+
+@nodeclass
+class ArrayDivNode(UfuncNode):
+    """Compute the quotient of the two arguments."""
+
+    __slots__ = ()
+
+    ufunc = np.true_divide
+
+    def compute_value(self, a, b):
+        return super().compute_value(a, b)
+
+
+@nodeclass
+class ArrayPowNode(UfuncNode):
+    """Raise the first argument to the power of the second argument."""
+
+    __slots__ = ()
+
+    ufunc = np.power
+
+    def compute_value(self, a, b):
+        return super().compute_value(a, b)
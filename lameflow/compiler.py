@@ -0,0 +1,268 @@
+"""Compile the part of a Graph computing some Nodes into a function."""
+
+__all__ = ["CompiledGraph", "compile_graph"]
+
+import itertools
+import keyword
+
+from .core import *
+from .math import *
+from .node import *
+
+
+# The operators computing the Nodes in lameflow.math, for Nodes with
+# exactly two arguments. AddNode and MulNode reduce any number of
+# arguments from left to right, like the operators.
+_BINARY_OPERATORS = {
+    SubNode: "-",
+    DivNode: "/",
+    PowNode: "**",
+}
+_REDUCING_OPERATORS = {
+    AddNode: "+",
+    MulNode: "*",
+}
+
+
+class _Value:
+    """Stand in for an argument of a Node, holding only its value."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+
+def compile_graph(outputs, inputs=None, fallback=False):
+    """Return a CompiledGraph computing outputs from inputs."""
+
+    return CompiledGraph(outputs, inputs, fallback)
+
+
+class CompiledGraph:
+    """A function computing the values of some Nodes from the values of
+    their inputs, without going through the Graph.
+
+    outputs is a Node or a list of Nodes, and inputs is a list of the
+    Nodes whose values are passed to the function, which defaults to
+    every VarNode the outputs depend on, in the order they were created
+    (see the inputs attribute). Calling the CompiledGraph with
+    one value for each input returns the value of outputs (or a tuple of
+    values, if outputs is a list). The values of the input Nodes are not
+    changed.
+
+    The function runs straight-line code generated from the Nodes in
+    topological order: the Nodes in lameflow.math become operators,
+    FuncNodes call their functions directly, and other Nodes have
+    compute_value called with stand-ins whose value attribute holds the
+    value of each argument. Nodes which do not depend on the inputs are
+    read from the Graph as usual.
+
+    If the arguments of a compiled Node change, the function is
+    regenerated on the next call, or, if fallback is true, the outputs
+    are computed by evaluate_scenarios with a single scenario instead,
+    until recompile() is called.
+    """
+
+    def __init__(self, outputs, inputs=None, fallback=False):
+        self._single = isinstance(outputs, Node)
+        self.outputs = [outputs] if self._single else list(outputs)
+        if not self.outputs:
+            raise ValueError("Expected at least one output Node.")
+        self.graph = self.outputs[0]._graph
+        self._given_inputs = None if inputs is None else list(inputs)
+        self.fallback = fallback
+        self.recompile()
+
+    def recompile(self):
+        """Generate the function from the current arguments of the
+        Nodes.
+        """
+
+        inputs = self._given_inputs
+        order = _topological_order(self.outputs, inputs or ())
+        if inputs is None:
+            inputs = sorted(
+                    (node for node in order if isinstance(node, VarNode)),
+                    key=lambda node: node.key[1])
+        self.inputs = inputs
+
+        self.source, self._function = _generate(
+                order, inputs, self.outputs, self._single)
+
+        self._structure = [(node, tuple(node._args),
+                tuple(node._kwargs.items())) for node in order]
+        self._version = self.graph._structure_version
+        self._compiled = True
+
+    def __call__(self, *values):
+        if len(values) != len(self.inputs):
+            raise TypeError(f"Expected {len(self.inputs)} input values, "
+                    f"got {len(values)}.")
+
+        if self._version != self.graph._structure_version:
+            if not self._compiled:
+                return self._evaluate(values)
+            if self._structure_changed():
+                if self.fallback:
+                    self._compiled = False
+                    return self._evaluate(values)
+                self.recompile()
+        return self._function(*values)
+
+    def _structure_changed(self):
+        """Return whether the arguments of a compiled Node changed."""
+
+        for node, args, kwargs in self._structure:
+            if (tuple(node._args) != args
+                    or tuple(node._kwargs.items()) != kwargs):
+                return True
+        self._version = self.graph._structure_version
+        return False
+
+    def _evaluate(self, values):
+        """Compute the outputs from the current arguments of the Nodes,
+        without changing the input Nodes.
+        """
+
+        # lameflow.scenarios imports this module.
+        from .scenarios import evaluate_scenarios
+
+        bindings = {node: [value]
+                for node, value in zip(self.inputs, values)}
+        with self.graph:
+            result, = evaluate_scenarios(
+                    self.outputs[0] if self._single else self.outputs,
+                    bindings)
+        return result
+
+
+def _topological_order(outputs, inputs):
+    """Return outputs and the Nodes they depend on, ordered so that each
+    Node comes after its arguments, without the arguments of inputs.
+    """
+
+    inputs = set(inputs)
+    order = []
+    visited = set()
+    for output in outputs:
+        if output in visited:
+            continue
+        visited.add(output)
+        frames = [(output, _arguments(output, inputs))]
+        on_path = {output}
+        while frames:
+            node, remaining_args = frames[-1]
+            for arg in remaining_args:
+                if arg in on_path:
+                    raise DependencyCycleError(
+                            [n for n, _ in frames] + [arg])
+                if arg not in visited:
+                    visited.add(arg)
+                    on_path.add(arg)
+                    frames.append((arg, _arguments(arg, inputs)))
+                    break
+            else:
+                frames.pop()
+                on_path.remove(node)
+                order.append(node)
+    return order
+
+
+def _arguments(node, inputs):
+    if node in inputs:
+        return iter(())
+    return itertools.chain(node._args, node._kwargs.values())
+
+
+def _generate(order, inputs, outputs, single):
+    """Return the source of a function computing outputs from inputs,
+    and the function.
+    """
+
+    names = {}
+    params = []
+    for i, node in enumerate(inputs):
+        names[node] = f"p{i}"
+        params.append(names[node])
+
+    # Objects used by the function, bound as closure variables.
+    bound = {}
+    lines = []
+    dependent = set(inputs)
+
+    for i, node in enumerate(order):
+        if node in names:
+            continue
+        args = [names[arg] for arg in node._args]
+        kwargs = {k: names[arg] for k, arg in node._kwargs.items()}
+        cls = node.__class__
+
+        if isinstance(node, ConstNode):
+            names[node] = f"c{i}"
+            bound[names[node]] = node.value
+            continue
+
+        names[node] = f"x{i}"
+        if not any(arg in dependent for arg in itertools.chain(
+                node._args, node._kwargs.values())):
+            # The Graph only recomputes this Node when it changes.
+            bound[f"n{i}"] = node
+            expression = f"n{i}.value"
+        else:
+            dependent.add(node)
+            if node._async:
+                raise TypeError("Cannot compile a "
+                        f"{cls.__name__}, which is asynchronous.")
+            if cls in _REDUCING_OPERATORS and args and not kwargs:
+                expression = f" {_REDUCING_OPERATORS[cls]} ".join(args)
+            elif (cls in _BINARY_OPERATORS and len(args) == 2
+                    and not kwargs):
+                expression = f" {_BINARY_OPERATORS[cls]} ".join(args)
+            elif cls is FuncNode:
+                bound[f"f{i}"] = node._kwargs["__func"].value
+                del kwargs["__func"]
+                expression = _call(f"f{i}", args, kwargs)
+            else:
+                bound[f"n{i}"] = node
+                expression = _call(f"n{i}.compute_value",
+                        [f"_Value({a})" for a in args],
+                        {k: f"_Value({a})" for k, a in kwargs.items()})
+        comment = node.name or cls.__name__
+        if not (isinstance(comment, str) and comment.isprintable()):
+            # A line break in the name would end the comment.
+            comment = repr(comment)
+        lines.append(f"        {names[node]} = {expression}  # {comment}")
+
+    if single:
+        result = names[outputs[0]]
+    else:
+        result = f"({', '.join(names[node] for node in outputs)},)"
+    bound["_Value"] = _Value
+
+    source = "\n".join([
+        f"def _make({', '.join(bound)}):",
+        f"    def compiled({', '.join(params)}):",
+        *lines,
+        f"        return {result}",
+        "    return compiled",
+    ])
+    namespace = {}
+    exec(compile(source, "<compiled graph>", "exec"), namespace)
+    return source, namespace["_make"](**bound)
+
+
+def _call(func, args, kwargs):
+    """Return the source of a call of func."""
+
+    args = list(args)
+    splat = {}
+    for k, a in kwargs.items():
+        if k.isidentifier() and not keyword.iskeyword(k):
+            args.append(f"{k}={a}")
+        else:
+            splat[k] = a
+    if splat:
+        items = ", ".join(f"{k!r}: {a}" for k, a in splat.items())
+        args.append(f"**{{{items}}}")
+    return f"{func}({', '.join(args)})"
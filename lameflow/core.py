@@ -5,7 +5,8 @@ __all__ = [
     "IndependentNode",
     "ConstNode",
     "VarNode",
-    "FuncNode"
+    "FuncNode",
+    "AsyncFuncNode",
 ]
 
 from .node import *
@@ -15,26 +16,22 @@ from .node import *
 class SingleAssignNode(Node):
     """A Node whose value can only be assigned once."""
 
-    def invalidate(self):
-        if self.state == Node.State.VALID:
-            raise TypeError("Cannot invalidate the value of a "
-                    f"{self.__class__.__name__}.")
-        else:
-            super().invalidate()
+    __slots__ = ()
+
+    _invalidatable = False
 
 
 @nodeclass
 class IndependentNode(Node):
     """A Node whose value is not dependent on other Nodes."""
 
+    __slots__ = ()
+
     def __init__(self, value, **kwargs):
         super().__init__()
         self.value = value
 
-        self.args.listeners.add(self._args_modified_error)
-        self.kwargs.listeners.add(self._args_modified_error)
-
-    def _args_modified_error(self, *args, **kwargs):
+    def _on_arg_add(self, arg):
         raise TypeError("Cannot add arguments to a "
                 f"{self.__class__.__name__}.")
 
@@ -43,6 +40,8 @@ class IndependentNode(Node):
 class ConstNode(IndependentNode, SingleAssignNode):
     """A Node whose value is a hashable constant."""
 
+    __slots__ = ("__initialized",)
+
     @Node.value.setter
     def value(self, new_value):
         # Allow the value to be changed exactly once, during __init__.
@@ -64,15 +63,14 @@ class VarNode(IndependentNode):
     VarNode instances are never memoized.
     """
 
-    _instance_counter = -1
+    __slots__ = ()
 
     def __str__(self):
         return f"{self.__class__.__name__}[{self.key[1]}]"
 
     @staticmethod
     def key(cls, *args, **kwargs):
-        VarNode._instance_counter += 1
-        return (cls, VarNode._instance_counter)
+        return (cls, next(Graph.current()._instance_counter))
 
 
 @nodeclass
@@ -85,6 +83,8 @@ class FuncNode(Node):
     Node's value.
     """
 
+    __slots__ = ()
+
     def __init__(self, func, *args, **kwargs):
         kwargs["__func"] = ConstNode(func)
         super().__init__(*args, **kwargs)
@@ -96,15 +96,31 @@ class FuncNode(Node):
 
     def __str__(self):
         try:
-            func_name = self.kwargs["__func"].value.__qualname__
+            func_name = self._kwargs["__func"].value.__qualname__
         except KeyError:
             func_name = "None"
 
         before = f"{self.__class__.__name__}[{func_name}("
 
-        args = [str(arg) for arg in self.args]
-        args.extend(f"{k}={v}" for k, v in self.kwargs.items()
+        args = [str(arg) for arg in self._args]
+        args.extend(f"{k}={v}" for k, v in self._kwargs.items()
                 if not k.startswith("__"))
         args = ", ".join(args)
 
         return before + args + ")]"
+
+
+@nodeclass
+class AsyncFuncNode(FuncNode):
+    """A FuncNode whose function is a coroutine function.
+
+    The value of an AsyncFuncNode (and of any Node which depends on it)
+    must be computed with avalue().
+    """
+
+    __slots__ = ()
+
+    _async = True
+
+    async def compute_value(self, *args, **kwargs):
+        return await super().compute_value(*args, **kwargs)
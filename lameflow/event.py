@@ -1,6 +1,7 @@
 """Allow observation of Node creation and modification."""
 
 __all__ = [
+    "EventListeners",
     "NodeEvent",
     "NodeCreateEvent",
     "NodeStateEvent",
@@ -11,22 +12,108 @@ __all__ = [
     "NodeCallStackEvent",
     "NodeCallStackPushEvent",
     "NodeCallStackPopEvent",
+    "NodeBatchEvent",
 ]
 
+import weakref
+
+from ._collections import ObservableSet
+
+
+class EventListeners:
+    """Listeners subscribed to NodeEvents, by event class.
+
+    Listeners subscribed to an event class receive events of that class
+    and its subclasses. Each Graph has its own EventListeners, and also
+    dispatches events to the listeners subscribed through the listeners
+    attribute of each event class, which receive events from every
+    Graph.
+    """
+
+    def __init__(self, parent=None):
+        self._sets = {}
+        self._parent = parent
+        self._children = weakref.WeakSet()
+        if parent is not None:
+            parent._children.add(self)
+
+        self.dispatch = _Dispatch(self)
+        """Map each event class to the listeners receiving its events.
+
+        An empty tuple means that the event need not be created.
+        """
+
+    def __getitem__(self, event_class):
+        """Return the set of listeners subscribed to event_class."""
+
+        try:
+            return self._sets[event_class]
+        except KeyError:
+            listeners = self._sets[event_class] = ObservableSet()
+            listeners.listeners.add(self._on_change)
+            return listeners
+
+    def _on_change(self, mutation=None):
+        self.dispatch.clear()
+        for child in self._children:
+            child._on_change()
+
+    def _collect(self, event_class):
+        listeners = {}
+        if self._parent is not None:
+            listeners.update(dict.fromkeys(self._parent._collect(event_class)))
+        for base in event_class.__mro__:
+            if base in self._sets:
+                listeners.update(dict.fromkeys(self._sets[base]))
+        return tuple(listeners)
+
+
+class _Dispatch(dict):
+    """Cache the listeners which receive each class of event."""
+
+    def __init__(self, listeners):
+        super().__init__()
+        self._listeners = listeners
+
+    def __missing__(self, event_class):
+        dispatch = self[event_class] = self._listeners._collect(event_class)
+        return dispatch
+
+
+_global_listeners = EventListeners()
+
+
 class NodeEvent:
-    """Represent a change that occurred to a Node (for logging)."""
+    """Represent a change that occurred to a Node (for logging).
 
-    listeners = set()
+    Each event class has its own set of listeners, which receive
+    events of that class and its subclasses from every Graph. For
+    example, listeners in NodeEvent.listeners receive every event, while
+    listeners in NodeCreateEvent.listeners only receive NodeCreateEvents.
+    Listeners for the events of a single Graph can be added to
+    graph.listeners[event_class].
 
-    def __init__(self, node):
+    Events are only instantiated if some listener would receive them,
+    so unobserved events cost nothing.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.listeners = _global_listeners[cls]
+
+    def __init__(self, node, graph=None):
         self.node = node
 
-        for listener in NodeEvent.listeners:
+        if graph is None:
+            graph = node._graph
+        for listener in graph._dispatch[self.__class__]:
             listener(self)
 
     def __str__(self):
         return f"{self.__class__.__name__}: {self.node}"
 
+NodeEvent.listeners = _global_listeners[NodeEvent]
+
 
 class NodeCreateEvent(NodeEvent):
     """Fired when a new Node is created."""
@@ -86,3 +173,21 @@ class NodeCallStackPushEvent(NodeCallStackEvent):
 
 class NodeCallStackPopEvent(NodeCallStackEvent):
     pass
+
+
+class NodeBatchEvent(NodeEvent):
+    """Fired once when a batch of changes to Node values is committed.
+
+    The changed Nodes are in nodes, and the Nodes invalidated as a
+    result are in invalidated. The node attribute is None.
+    """
+
+    def __init__(self, graph, nodes, invalidated):
+        self.nodes = nodes
+        self.invalidated = invalidated
+        super().__init__(None, graph)
+
+    def __str__(self):
+        return (f"{self.__class__.__name__}: {len(self.nodes)} changed, "
+                f"{len(self.invalidated)} invalidated")
+
@@ -1,9 +1,12 @@
 import itertools
 import re
 import textwrap
+import weakref
 
 from .node import *
+from .node import _unverified
 from .core import *
+from .event import *
 
 
 before = textwrap.dedent("""\
@@ -16,14 +19,18 @@ before = textwrap.dedent("""\
 after = "}"
 
 
-def dot_source(label=""):
+def dot_source(label="", graph=None):
+    if graph is None:
+        graph = Graph.current()
+
     chunks = []
-    nodes = [DotNode(n) for n in Node._by_key.values()]
+    nodes = [DotNode(n) for n in graph.memo.values()]
 
     for node in nodes:
         chunks.append(node.definition)
 
-    call_stack_adj = set(zip(NodeCallStack.stack, NodeCallStack.stack[1:]))
+    stack = graph.call_stack.stack
+    call_stack_adj = set(zip(stack, stack[1:]))
     for node in nodes:
         chunks.append(node.edges(call_stack_adj))
 
@@ -37,8 +44,13 @@ class DotNode:
         Node.State.VALID: "#ddffdd",
         Node.State.PENDING: "#ffffdd",
         Node.State.INVALID: "#ffdddd",
+        Node.State.COLLECTED: "#dddddd",
     }
 
+    # The color of a valid Node which may be outdated, in a lazily
+    # invalidated Graph.
+    unverified_color = "#ffeedd"
+
     @staticmethod
     def format_attrs(attrs):
         return "[" + " ".join(f'{k}="{v}"' for k, v in attrs.items()) + "]"
@@ -50,7 +62,10 @@ class DotNode:
     def definition(self):
         attrs = {}
         attrs["label"] = self.label
-        attrs["fillcolor"] = DotNode.state_to_color[self.node.state]
+        if self._outdated:
+            attrs["fillcolor"] = DotNode.unverified_color
+        else:
+            attrs["fillcolor"] = DotNode.state_to_color[self.node.state]
         return f"{id(self.node)} {DotNode.format_attrs(attrs)}"
 
     @property
@@ -59,7 +74,7 @@ class DotNode:
         rows = []
 
         args = []
-        for arg_name in itertools.chain(range(len(node.args)), node.kwargs):
+        for arg_name in itertools.chain(range(len(node._args)), node._kwargs):
             args.append(f"<{arg_name}>{arg_name}")
         if args:
             rows.append("{" + "|".join(args) + "}")
@@ -73,32 +88,211 @@ class DotNode:
 
         return "{" + "|".join(rows) + "}"
 
+    @property
+    def _outdated(self):
+        """Whether the node is valid but may be outdated, in a lazily
+        invalidated Graph.
+        """
+
+        node = self.node
+        return node.state == Node.State.VALID and _unverified(node)
+
     @property
     def value_str(self):
+        # The value is read without computing anything, since this may
+        # be called from an event listener.
         node = self.node
         if node.state != Node.State.VALID:
             s = node.state.name
-        elif hasattr(node.value, "__qualname__"):
-            s = node.value.__qualname__
+        elif self._outdated:
+            s = "UNVERIFIED"
+        elif hasattr(node._value, "__qualname__"):
+            s = node._value.__qualname__
         else:
-            s = repr(node.value)
+            s = repr(node._value)
         return re.sub(r"([\\{}|<>]|\\n)", r"\\1", s)
 
     def edges(self, highlighted_pairs):
+        lines = self.edge_lines(highlighted_pairs)
+        return "\n".join(line for _, line in lines)
+
+    def edge_lines(self, highlighted_pairs):
+        """Return the edges into this node, as a list of (other node,
+        line) pairs.
+        """
+
         node = self.node
         lines = []
 
         if (hasattr(node, "_created_by")
-                and not node._created_by._arg_refcount.get(node)):
+                and node._created_by not in node._dependents):
             # Creator node has not added this argument yet.
-            lines.append(
-                    f"{id(node)} -> {id(node._created_by)} [style=dashed]")
+            lines.append((node._created_by,
+                    f"{id(node)} -> {id(node._created_by)} [style=dashed]"))
 
         for name, arg in itertools.chain(
-                enumerate(node.args), node.kwargs.items()):
+                enumerate(node._args), node._kwargs.items()):
             line = f'{id(arg)}:"!":s -> {id(node)}:"{name}":n'
             if (node, arg) in highlighted_pairs:
                 line += " [penwidth=4]"
-            lines.append(line)
+            lines.append((arg, line))
+
+        return lines
+
+
+class DotExporter:
+    """Keep a DOT model of a Graph up to date from its events.
+
+    Instead of rebuilding the DOT text of every node each time, like
+    dot_source, a DotExporter listens to the events of a Graph and only
+    rebuilds the text of the nodes which changed. Call close() (or use
+    the exporter as a context manager) to stop listening.
+
+    If on_update is given, it is called with the exporter and the event
+    after each event, such as to save a frame of an animation.
+    """
+
+    def __init__(self, graph=None, on_update=None):
+        if graph is None:
+            graph = Graph.current()
+        self.graph = graph
+        self.on_update = on_update
+
+        # The definition and edge lines of each node, in creation order.
+        self._lines = weakref.WeakKeyDictionary()
+
+        # Nodes whose lines must be rebuilt, and nodes which changed
+        # since the last call to delta().
+        self._stale = weakref.WeakSet()
+        self._changed = weakref.WeakSet()
+
+        # Changing a value in a lazily invalidated Graph fires no events
+        # for the Nodes which may become outdated, so every node is
+        # rebuilt after such a change.
+        self._written_at = graph._written_at
+
+        for node in graph.memo.values():
+            self._lines[node] = None
+            self._mark(node)
+
+        graph.listeners[NodeEvent].add(self)
+
+    def close(self):
+        """Stop listening to the events of the Graph."""
+
+        self.graph.listeners[NodeEvent].discard(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __call__(self, event):
+        node = event.node
+        if isinstance(event, NodeCreateEvent):
+            self._lines[node] = None
+            self._mark(node)
+            # The creator is still in its __init__, which may have set
+            # its name.
+            if hasattr(node, "_created_by"):
+                self._mark(node._created_by)
+        elif isinstance(event, (NodeStateEvent, NodeValueEvent)):
+            self._mark(node)
+        elif isinstance(event, NodeArgEvent):
+            # The argument's dashed edge to its creator may change.
+            self._mark(node)
+            self._mark(event.arg)
+        elif isinstance(event, NodeCallStackEvent):
+            # A node is popped when its __init__ finishes, which may have
+            # set its name.
+            self._mark(node)
+
+            # The edge from the node to the one below it on the stack is
+            # highlighted while both are on the stack.
+            stack = self.graph.call_stack.stack
+            if isinstance(event, NodeCallStackPushEvent):
+                below = stack[-2] if len(stack) > 1 else None
+            else:
+                below = stack[-1] if stack else None
+            if below is not None:
+                self._mark(below)
+
+        if self.on_update is not None:
+            self.on_update(self, event)
+
+    def _mark(self, node):
+        if node in self._lines:
+            self._stale.add(node)
+            self._changed.add(node)
+
+    def _refresh(self):
+        """Rebuild the lines of the stale nodes."""
+
+        if self._written_at != self.graph._written_at:
+            self._written_at = self.graph._written_at
+            for node in self._lines.keys():
+                self._mark(node)
+        if not self._stale:
+            return
+        stack = self.graph.call_stack.stack
+        call_stack_adj = set(zip(stack, stack[1:]))
+        for node in self._stale:
+            dot_node = DotNode(node)
+            self._lines[node] = (
+                    dot_node.definition, dot_node.edge_lines(call_stack_adj))
+        self._stale.clear()
+
+    def source(self, label="", around=None, radius=1):
+        """Return the DOT source of the graph.
+
+        If around is a node, only the nodes at most radius arguments or
+        dependents away from it are included.
+        """
+
+        self._refresh()
+        if around is None:
+            nodes = list(self._lines.keys())
+        else:
+            nodes = [n for n in _neighborhood(around, radius)
+                    if n in self._lines]
+        included = set(nodes)
+
+        chunks = [self._lines[node][0] for node in nodes]
+        for node in nodes:
+            chunks.extend(line for other, line in self._lines[node][1]
+                    if other in included)
+        return "\n".join([before, f'label = "{label}"', *chunks, after])
+
+    def delta(self):
+        """Return the DOT statements defining the nodes which changed
+        since the last call, and the edges into them.
+        """
+
+        self._refresh()
+        chunks = []
+        for node in self._changed:
+            definition, edge_lines = self._lines[node]
+            chunks.append(definition)
+            chunks.extend(line for _, line in edge_lines)
+        self._changed.clear()
+        return "\n".join(chunks)
+
+
+def _neighborhood(node, radius):
+    """Return the nodes at most radius arguments or dependents away from
+    node, in breadth-first order.
+    """
 
-        return "\n".join(lines)
+    found = {node: None}
+    frontier = [node]
+    for _ in range(radius):
+        next_frontier = []
+        for current in frontier:
+            for other in itertools.chain(current._args,
+                    current._kwargs.values(), current._dependents):
+                if other not in found:
+                    found[other] = None
+                    next_frontier.append(other)
+        frontier = next_frontier
+    return list(found)
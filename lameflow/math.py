@@ -19,6 +19,8 @@ from .node import *
 class AddNode(Node):
     """Compute the sum of the arguments."""
 
+    __slots__ = ()
+
     def compute_value(self, *args):
         return functools.reduce(operator.add, (a.value for a in args))
 
@@ -27,6 +29,8 @@ class AddNode(Node):
 class SubNode(Node):
     """Compute the difference of the two arguments."""
 
+    __slots__ = ()
+
     def compute_value(self, a, b):
         return a.value - b.value
 
@@ -35,6 +39,8 @@ class SubNode(Node):
 class MulNode(Node):
     """Compute the product of the arguments."""
 
+    __slots__ = ()
+
     def compute_value(self, *args):
         return functools.reduce(operator.mul, (a.value for a in args))
 
@@ -43,6 +49,8 @@ class MulNode(Node):
 class DivNode(Node):
     """Compute the quotient of the two arguments."""
 
+    __slots__ = ()
+
     def compute_value(self, a, b):
         return a.value / b.value
 
@@ -51,5 +59,7 @@ class DivNode(Node):
 class PowNode(Node):
     """Raise the first argument to the power of the second argument."""
 
+    __slots__ = ()
+
     def compute_value(self, a, b):
         return a.value ** b.value
@@ -0,0 +1,266 @@
+"""Tables which memoize Node instances by key."""
+
+__all__ = ["Memo", "UnboundedMemo", "WeakMemo", "LRUMemo"]
+
+from collections import OrderedDict
+from collections.abc import MutableMapping
+import sys
+import weakref
+
+
+class Memo(MutableMapping):
+    """Map Node keys to Node instances, counting hits and misses.
+
+    Subclasses decide how long a Node stays memoized by choosing the
+    underlying table, and may evict Nodes to stay within a budget.
+    """
+
+    weak_dependents = False
+    """Whether Nodes refer to their dependents weakly, so that a Node
+    which is only used as an argument does not keep its dependents
+    alive.
+    """
+
+    def __init__(self, table):
+        self._table = table
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # A function looking up a key in the table, which Node creation
+        # calls instead of get() (counting hits and misses itself), or
+        # None if get() must be called.
+        self._fast_get = None
+
+    def __repr__(self):
+        return (f"{self.__class__.__name__}(size={len(self)}, "
+                f"hits={self.hits}, misses={self.misses}, "
+                f"evictions={self.evictions})")
+
+    @property
+    def stats(self):
+        """Return the hit, miss, and eviction counters as a dict."""
+
+        return {
+            "size": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def get(self, key, default=None):
+        node = self._table.get(key)
+        if node is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return node
+
+    def __getitem__(self, key):
+        return self._table[key]
+
+    def __setitem__(self, key, node):
+        self._table[key] = node
+
+    def __delitem__(self, key):
+        del self._table[key]
+
+    def __iter__(self):
+        return iter(list(self._table))
+
+    def __len__(self):
+        return len(self._table)
+
+
+class _WeakNodeTable:
+    """Map keys to Nodes without holding strong references to either.
+
+    A weak-valued dict would keep each key alive, and a key usually
+    refers to the Node's arguments, which refer back to the Node
+    through their dependents. Instead, Nodes are bucketed by the hash
+    of their key and compared with their own key attribute on lookup.
+    """
+
+    def __init__(self, on_free=None):
+        self._buckets = {}
+        self._len = 0
+        # Called whenever a memoized Node is freed.
+        self._on_free = on_free
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        for bucket in list(self._buckets.values()):
+            for ref in bucket:
+                node = ref()
+                if node is not None:
+                    yield node.key
+
+    def get(self, key, default=None):
+        bucket = self._buckets.get(hash(key))
+        if bucket is not None:
+            for ref in bucket:
+                node = ref()
+                if node is not None and node.key == key:
+                    return node
+        return default
+
+    def __getitem__(self, key):
+        node = self.get(key)
+        if node is None:
+            raise KeyError(key)
+        return node
+
+    def __setitem__(self, key, node):
+        if key in self:
+            del self[key]
+        h = hash(key)
+        ref = weakref.ref(node, self._remover(h))
+        self._buckets.setdefault(h, []).append(ref)
+        self._len += 1
+
+    def __delitem__(self, key):
+        h = hash(key)
+        for ref in self._buckets.get(h, ()):
+            node = ref()
+            if node is not None and node.key == key:
+                self._discard(h, ref)
+                return
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def _remover(self, h):
+        table = weakref.ref(self)
+
+        def remove(ref):
+            current = table()
+            if current is not None and current._discard(h, ref):
+                if current._on_free is not None:
+                    current._on_free()
+
+        return remove
+
+    def _discard(self, h, ref):
+        """Remove ref, and return whether it was in the table."""
+
+        bucket = self._buckets.get(h)
+        try:
+            bucket.remove(ref)
+        except (AttributeError, ValueError):
+            return False
+        self._len -= 1
+        if not bucket:
+            del self._buckets[h]
+        return True
+
+
+class UnboundedMemo(Memo):
+    """Memoize every Node for as long as the process runs."""
+
+    def __init__(self):
+        super().__init__({})
+        if self.__class__.get is Memo.get:
+            self._fast_get = self._table.get
+
+
+class WeakMemo(Memo):
+    """Memoize Nodes only while something else refers to them.
+
+    A Node stays memoized while user code holds it, or while a live
+    Node holds it as an argument. Nodes refer to their dependents
+    weakly, so an argument which is still in use, such as a shared
+    input, does not keep its dependents alive. The evictions counter
+    counts the memoized Nodes which were freed.
+    """
+
+    weak_dependents = True
+
+    def __init__(self):
+        super().__init__(_WeakNodeTable(self._freed))
+
+    def _freed(self):
+        self.evictions += 1
+
+
+def _default_sizeof(node):
+    value = getattr(node, "_value", None)
+    return sys.getsizeof(node) + sys.getsizeof(value)
+
+
+class LRUMemo(WeakMemo):
+    """Keep the most recently used Nodes memoized, up to a maximum
+    number of Nodes or an approximate number of bytes.
+
+    Beyond the budget, Nodes are memoized weakly, as in WeakMemo. A
+    Node which is still in use, such as the argument of a live Node, is
+    not freed; it only stops counting against the budget, and is only
+    counted as evicted once it is freed.
+
+    The size of a Node is estimated with sizeof, which is called when
+    the Node is memoized and each time it is looked up.
+    """
+
+    def __init__(self, max_size=None, max_bytes=None, sizeof=None):
+        super().__init__()
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.sizeof = _default_sizeof if sizeof is None else sizeof
+
+        # Strong references to recently used Nodes, with their sizes,
+        # from least to most recently used.
+        self._recent = OrderedDict()
+        self._bytes = 0
+
+    @property
+    def stats(self):
+        stats = super().stats
+        stats["recent"] = len(self._recent)
+        stats["bytes"] = self._bytes
+        return stats
+
+    def get(self, key, default=None):
+        node = super().get(key)
+        if node is None:
+            return default
+        self._use(key, node)
+        return node
+
+    def __setitem__(self, key, node):
+        super().__setitem__(key, node)
+        self._use(key, node)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._forget(key)
+
+    def _use(self, key, node):
+        """Mark a Node as the most recently used, then evict Nodes until
+        the memo is within its budget.
+        """
+
+        self._forget(key)
+        size = self.sizeof(node) if self.max_bytes is not None else 0
+        self._recent[key] = (node, size)
+        self._bytes += size
+        self._evict()
+
+    def _forget(self, key):
+        try:
+            _, size = self._recent.pop(key)
+        except KeyError:
+            return
+        self._bytes -= size
+
+    def _over_budget(self):
+        return ((self.max_size is not None
+                    and len(self._recent) > self.max_size)
+                or (self.max_bytes is not None
+                    and self._bytes > self.max_bytes))
+
+    def _evict(self):
+        while self._recent and self._over_budget():
+            _, (node, size) = self._recent.popitem(last=False)
+            self._bytes -= size
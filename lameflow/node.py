@@ -3,17 +3,37 @@
 __all__ = [
     "nodeclass",
     "Node",
+    "Graph",
     "NodeCallStack",
+    "Batch",
     "DependencyCycleError",
     "SameKeyError"
 ]
 
+import asyncio
+import contextvars
 import enum
+import itertools
+import sys
+import threading
+import time
+import types
 from typing import NamedTuple
+import weakref
 
 from .event import *
+from .event import _global_listeners
+from .memo import *
 
 from ._collections import FrozenDict, ObservableList, ObservableDict
+from ._collections import _list_diff, _dict_diff
+
+
+# The keyword arguments of a Node which has none.
+_NO_KWARGS = types.MappingProxyType({})
+
+# Marks a Node in Graph._computing which no other thread waits for.
+_CLAIMED = object()
 
 
 def nodeclass(cls):
@@ -30,11 +50,13 @@ def nodeclass(cls):
     init = cls.__init__
 
     def init_wrapper(self, *args, **kwargs):
-        if not hasattr(self, "_init_run_for_class"):
-            self._init_run_for_class = set()
-        if cls not in self._init_run_for_class:
+        # Each class in the hierarchy is wrapped, so only the outermost
+        # __init__ marks the Node as initialized, and calling __init__
+        # again afterwards does nothing.
+        if not self._initialized:
             init(self, *args, **kwargs)
-            self._init_run_for_class.add(cls)
+            if cls is self.__class__:
+                self._initialized = True
 
     cls.__init__ = init_wrapper
 
@@ -44,11 +66,74 @@ def nodeclass(cls):
     return cls
 
 
-class _NodeSuperclass:
+class _Key:
+    """Descriptor for the key method of Node classes.
+
+    Accessed on a class, this is the key method. Accessed on a Node, it
+    is the key of that Node, which is stored in the _key slot since
+    Nodes have no __dict__ to shadow the method with.
+    """
+
+    def __init__(self, method):
+        self.method = method
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self.method.__get__(None, owner)
+        return instance._key
+
+
+class _NodeMeta(type):
+    """Metaclass of Nodes, which returns memoized Nodes without calling
+    __new__ or __init__.
+    """
+
+    def __call__(cls, *args, **kwargs):
+        graph = _current_graph.get()
+        name = kwargs.pop("__name", None) if kwargs else None
+        if not cls._default_key:
+            key = cls.key(cls, *args, **kwargs)
+        elif kwargs:
+            # The key returned by Node.key, without calling it.
+            key = ((cls, args, FrozenDict(kwargs)) if args
+                    else (cls, FrozenDict(kwargs)))
+        elif args:
+            key = (cls, args)
+        else:
+            key = (cls,)
+
+        memo = graph.memo
+        fast_get = memo._fast_get
+        if fast_get is None:
+            existing = memo.get(key)
+        else:
+            existing = fast_get(key)
+            if existing is None:
+                memo.misses += 1
+            else:
+                memo.hits += 1
+
+        if existing is not None:
+            if existing._same_key_error:
+                raise SameKeyError(key, existing.__class__, cls)
+            return existing
+
+        instance = cls.__new__(cls)
+        instance._key = key
+        instance._graph = graph
+        memo[key] = instance
+        instance._init(name)
+        instance.__init__(*args, **kwargs)
+        return instance
+
+
+class _NodeSuperclass(metaclass=_NodeMeta):
     """Dummy superclass allowing the Node class to use the functionality
     in __init_subclass__.
     """
 
+    __slots__ = ()
+
     def __init_subclass__(cls, /, same_key_error=None, **kwargs):
         """Customize Node subclass behavior.
 
@@ -71,6 +156,14 @@ class _NodeSuperclass:
         if same_key_error is not None:
             cls._same_key_error = same_key_error
 
+        key = cls.__dict__.get("key")
+        if key is not None:
+            if not isinstance(key, _Key):
+                cls.key = _Key(key)
+            # Whether the key of Node is used, so the metaclass can
+            # compute it inline.
+            cls._default_key = False
+
         # Add a dummy attribute to be removed by the node decorator. The
         # presence of this attribute indicates that the subclass was not
         # decorated.
@@ -93,75 +186,105 @@ class Node(_NodeSuperclass, same_key_error=False):
     """Represent a node in the data flow graph."""
 
     class State(enum.Enum):
-        """Whether a Node is invalidated, recalculating, or valid."""
+        """Whether a Node is invalidated, recalculating, valid, or was
+        removed from its Graph by Graph.collect().
+        """
         INVALID = enum.auto()
         PENDING = enum.auto()
         VALID = enum.auto()
+        COLLECTED = enum.auto()
 
-    _by_key = {}
-    """Index all Node instances by their keys."""
+    _invalidatable = True
+    """Whether a valid Node of this class may be invalidated."""
+
+    _async = False
+    """Whether compute_value is a coroutine function, in which case the
+    value can only be computed with avalue().
+    """
 
     _trace = []
     """Stack trace of executing Nodes."""
 
-    def __new__(new_class, *args, **kwargs):
-        name = kwargs.pop("__name", None)
-        key = new_class.key(new_class, *args, **kwargs)
-        existing = Node._by_key.get(key)
-        if existing is None:
-            instance = super().__new__(new_class)
-            Node._by_key[key] = instance
-            instance._init(key, name)
-            return instance
-        elif existing._same_key_error:
-            raise SameKeyError(key, existing.__class__, new_class)
-        else:
-            return existing
+    # Nodes are numerous, so their attributes are stored in slots rather
+    # than in a __dict__. Subclasses which add attributes should declare
+    # their own __slots__ to keep the savings.
+    __slots__ = (
+        "_key",
+        "name",
+        "_graph",
+        "_initialized",
+        "_state",
+        "_value",
+        "_changed_at",
+        "_verified_at",
+        "_inflight",
+        "_args",
+        "_kwargs",
+        "_dependents",
+        "_created_by",
+        "__weakref__",
+    )
 
     def __str__(self):
         return f"{self.__class__.__name__}[{self.key}]"
 
-    def __hash__(self):
-        if hasattr(self, "_hash"):
-            return self._hash
-        self._hash = hash(self.key)
-        return self._hash
-
     def _on_arg_add(self, arg):
-        self.invalidate()
-        try:
-            self._arg_refcount[arg] += 1
-        except KeyError:
+        if arg._graph is not self._graph:
+            raise ValueError(f"Cannot add argument {arg} to {self}, "
+                    "since they belong to different Graphs.")
+        if arg._state is Node.State.COLLECTED:
+            raise _collected_error(arg)
+        if arg._dependents:
             arg._dependents.add(self)
-            self._arg_refcount[arg] = 1
-        NodeArgAddEvent(self, arg)
+        elif self._graph.memo.weak_dependents:
+            arg._dependents = weakref.WeakSet((self,))
+        else:
+            arg._dependents = {self}
+        if self._graph._dispatch[NodeArgAddEvent]:
+            NodeArgAddEvent(self, arg)
 
-    def _on_arg_remove(self, arg):
-        self.invalidate()
-        self._arg_refcount[arg] -= 1
-        if self._arg_refcount[arg] == 0:
-            del self._arg_refcount[arg]
-            arg._dependents.remove(self)
-        NodeArgRemoveEvent(self, arg)
+    def _on_args_replaced(self, removed, added):
+        """Update dependents after the Nodes in removed were replaced by
+        the Nodes in added, invalidating this Node once.
+        """
 
-    def _on_args_changed(self, mutation):
-        for arg in mutation.added:
+        if not (removed or added):
+            return
+        if self._initialized:
+            # The arguments given to __init__ do not change the
+            # structure of any existing part of the Graph.
+            self._graph._structure_version += 1
+        self._invalidate_self()
+        for arg in added:
             self._on_arg_add(arg)
-        for arg in mutation.removed:
-            self._on_arg_remove(arg)
+
+        if removed:
+            # An argument may appear more than once, so this Node only
+            # stops depending on the arguments which no longer appear.
+            remaining = set(
+                    itertools.chain(self._args, self._kwargs.values()))
+            for arg in removed:
+                if arg not in remaining:
+                    arg._dependents.discard(self)
+                if self._graph._dispatch[NodeArgRemoveEvent]:
+                    NodeArgRemoveEvent(self, arg)
+
+        _update_observed(self._graph)
+
+    def _on_args_changed(self, mutation):
+        self._on_args_replaced(mutation.removed, mutation.added)
 
     def _on_kwargs_changed(self, mutation):
-        for arg in mutation.added.values():
-            self._on_arg_add(arg)
-        for arg in mutation.removed.values():
-            self._on_arg_remove(arg)
+        self._on_args_replaced(
+                list(mutation.removed.values()),
+                list(mutation.added.values()))
 
     @staticmethod
     def key(cls, *args, **kwargs):
         """Return a hashable key unique to a Node instance.
 
         This static method is passed the class of the requested instance
-        and the constructor arguments, just like __new__.
+        and the constructor arguments.
 
         If the returned key matches an existing Node instance, the
         existing instance will be returned (or a SameKeyError will be
@@ -174,42 +297,59 @@ class Node(_NodeSuperclass, same_key_error=False):
         the key.
         """
 
-        items = [cls]
-        if args:
-            items.append(tuple(args))
         if kwargs:
-            items.append(FrozenDict(kwargs))
-        return tuple(items)
+            if args:
+                return (cls, args, FrozenDict(kwargs))
+            return (cls, FrozenDict(kwargs))
+        elif args:
+            return (cls, args)
+        else:
+            return (cls,)
 
-    def _init(self, key, name):
-        """Do some initialization after __new__ but before __init__."""
+    def _init(self, name):
+        """Do some initialization after the Node is memoized but before
+        __init__.
+        """
 
-        self.key = key
         self.name = name
+        self._initialized = False
 
         self._state = Node.State.INVALID
         self._value = None
 
-        # Keyword and positional arguments to compute_value.
-        self._args = ObservableList()
-        self._kwargs = ObservableDict()
+        # The revision at which the value of this Node last changed, and
+        # the revision at which it was last computed or found to be
+        # unaffected by changes to its arguments (-1 if it must be
+        # recomputed).
+        self._changed_at = 0
+        self._verified_at = -1
+
+        # The task computing this Node's value in avalue(), if any.
+        self._inflight = None
 
-        self.args.listeners.add(self._on_args_changed)
-        self.kwargs.listeners.add(self._on_kwargs_changed)
+        # Positional and keyword arguments to compute_value. These are
+        # stored as a tuple and a read-only mapping, which are replaced
+        # by an ObservableList and ObservableDict the first time the
+        # args or kwargs properties are accessed (see _observable_args).
+        self._args = ()
+        self._kwargs = _NO_KWARGS
 
-        # Map Nodes to the number of times they appear in this Node's
-        # arguments.
-        self._arg_refcount = {}
+        # Nodes whose values depend on this Node. This is a set (or a
+        # WeakSet, if the memo has weak_dependents) once the first
+        # dependent is added.
+        self._dependents = ()
 
-        # Nodes whose values depend on this Node.
-        self._dependents = set()
+        if self._async:
+            self._graph._has_async = True
 
-        if NodeCallStack.stack:
-            self._created_by = NodeCallStack.stack[-1]
+        call_stack = self._graph.call_stack
+        if call_stack.stack:
+            self._created_by = call_stack.stack[-1]
 
-        NodeCreateEvent(self)
+        if self._graph._dispatch[NodeCreateEvent]:
+            NodeCreateEvent(self)
 
-        NodeCallStack._push(self)
+        call_stack._push(self)
 
     def __init__(self, *args, **kwargs):
         super().__init__()
@@ -219,7 +359,7 @@ class Node(_NodeSuperclass, same_key_error=False):
         self.args = args
         self.kwargs = kwargs
 
-        NodeCallStack._pop(self)
+        self._graph.call_stack._pop(self)
 
     @property
     def state(self):
@@ -229,36 +369,79 @@ class Node(_NodeSuperclass, same_key_error=False):
     def state(self, new_state):
         old_state = self._state
         self._state = new_state
-        NodeStateEvent(self, old_state, new_state)
+        if self._graph._dispatch[NodeStateEvent]:
+            NodeStateEvent(self, old_state, new_state)
 
     @property
     def args(self):
+        """The positional arguments of this Node, as an ObservableList
+        which can be modified to change them.
+        """
+
+        if self._args.__class__ is tuple:
+            self._args = ObservableList(self._args)
+            self._args.listeners.add(self._on_args_changed)
         return self._args
 
     @args.setter
     def args(self, value):
-        # Replace contents instead of replacing the attribute.
-        self._args.clear()
-        self._args.extend(value)
+        value = tuple(value)
+        old = self._args
+        if old.__class__ is tuple:
+            # Nothing observes the arguments yet, so replace the tuple
+            # instead of allocating a list.
+            self._args = value
+            _, removed, added = _list_diff(old, value)
+            self._on_args_replaced(removed, added)
+        else:
+            # Replace contents instead of replacing the attribute.
+            old.replace(value)
 
     @property
     def kwargs(self):
+        """The keyword arguments of this Node, as an ObservableDict
+        which can be modified to change them.
+        """
+
+        if self._kwargs.__class__ is not ObservableDict:
+            self._kwargs = ObservableDict(self._kwargs)
+            self._kwargs.listeners.add(self._on_kwargs_changed)
         return self._kwargs
 
     @kwargs.setter
     def kwargs(self, value):
-        # Replace contents instead of replacing the attribute.
-        self._kwargs.clear()
-        self._kwargs.update(value)
+        value = dict(value)
+        old = self._kwargs
+        if old.__class__ is not ObservableDict:
+            # Nothing observes the arguments yet, so replace the dict
+            # instead of allocating an ObservableDict.
+            self._kwargs = value if value else _NO_KWARGS
+            removed, added = _dict_diff(old, value)
+            self._on_args_replaced(
+                    list(removed.values()), list(added.values()))
+        else:
+            # Replace contents instead of replacing the attribute.
+            old.replace(value)
 
     def invalidate(self):
-        """Indicate that the value of this Node is no longer valid."""
+        """Indicate that the value of this Node is no longer valid.
 
+        Every valid Node which depends on this Node is also invalidated
+        (or, in a lazily invalidated Graph, checked when it is next
+        read). This Node will be recomputed when its value is next
+        requested, but its dependents are only recomputed if the new
+        value differs from the old one.
+        """
+
+        self._invalidate_self()
+        _update_observed(self._graph)
+
+    def _invalidate_self(self):
+        """Invalidate this Node without updating observed Nodes."""
+
+        self._verified_at = -1
         if self.state == Node.State.VALID:
-            with _NodeStackFrame(self):
-                self.state = Node.State.INVALID
-                for dependent in self._dependents:
-                    dependent.invalidate()
+            _invalidate([self])
 
     def compute_value(self, *args, **kwargs):
         """Compute this Node's value from its parent Nodes.
@@ -268,91 +451,857 @@ class Node(_NodeSuperclass, same_key_error=False):
 
         return None
 
+    def _needs_recompute(self):
+        """Return whether this Node must be recomputed, or whether its
+        previous value is still valid because none of its arguments
+        have changed value since it was last verified.
+
+        Raise a TypeError if the value of an argument changed but this
+        Node cannot be invalidated, which a lazily invalidated Graph
+        only finds out when the Node is read.
+        """
+
+        verified_at = self._verified_at
+        if verified_at < 0:
+            return True
+        for arg in itertools.chain(self._args, self._kwargs.values()):
+            if arg._changed_at > verified_at:
+                if not self._invalidatable:
+                    raise TypeError("Cannot invalidate the value of a "
+                            f"{self.__class__.__name__}.")
+                return True
+        return False
+
     @property
     def value(self):
         """Get the value of this Node, recomputing it if necessary."""
 
-        if self.state == Node.State.VALID:
+        graph = self._graph
+        if (self._state is Node.State.VALID
+                and (self._verified_at >= graph._written_at
+                or not (self._args or self._kwargs))):
+            profiler = graph.profiler
+            if profiler is not None:
+                profiler._hit(self)
             return self._value
         else:
-            with _NodeStackFrame(self):
-                self.state = Node.State.PENDING
-                self.value = self.compute_value(*self.args, **self.kwargs)
-                return self._value
+            _evaluate(self)
+            return self._value
+
+    async def avalue(self):
+        """Get the value of this Node, recomputing it if necessary.
+
+        Unlike value, this computes the values of asynchronous Nodes,
+        and computes independent invalid Nodes concurrently. Concurrent
+        calls share a single computation of each Node.
+        """
+
+        if not _unverified(self):
+            return self._value
+
+        # Start a task for every invalid Node, arguments first, so that
+        # each task can await the tasks of its arguments.
+        for node in _invalid_cone(self):
+            if node._inflight is None:
+                node._inflight = asyncio.ensure_future(node._acompute())
+        return await asyncio.shield(self._inflight)
+
+    async def _acompute(self):
+        """Compute the value of this Node once its arguments are valid."""
+
+        try:
+            self.state = Node.State.PENDING
+
+            args = set(itertools.chain(self._args, self._kwargs.values()))
+            await asyncio.gather(*(
+                    arg._inflight if arg._inflight is not None
+                    else arg.avalue()
+                    for arg in args if _unverified(arg)))
+
+            profiler = self._graph.profiler
+            if self._needs_recompute():
+                if profiler is not None:
+                    # Other tasks run while this one awaits, so nested
+                    # computations cannot be told apart.
+                    token = profiler._begin(self, nested=False)
+                cache = self._graph.cache
+                found, value = False, None
+                if cache is not None:
+                    found, value = cache.load(self)
+                if not found:
+                    value = self.compute_value(
+                            *self._args, **self._kwargs)
+                    if self._async:
+                        value = await value
+                    if cache is not None:
+                        cache.store(self, value)
+                if profiler is not None:
+                    profiler._end(self, token)
+                self.value = value
+            else:
+                if profiler is not None:
+                    profiler._hit(self)
+                self.state = Node.State.VALID
+            self._verified_at = self._graph._revision
+            return self._value
+        finally:
+            self._inflight = None
 
     @value.setter
     def value(self, new_value):
-        if self._value == new_value:
+        if self._state is Node.State.COLLECTED:
+            raise _collected_error(self)
+        if _values_equal(self._value, new_value):
+            # A recomputed value may equal the previous one; the Node
+            # must not be left PENDING in that case.
+            if self.state != Node.State.VALID:
+                self.state = Node.State.VALID
             return
 
-        self.invalidate()
+        graph = self._graph
+        if graph._batch is not None and self.state == Node.State.VALID:
+            # Invalidate dependents when the batch is committed, which
+            # must not fail once the new value has been assigned.
+            _check_invalidatable(self, graph._batch._checked)
+            graph._batch._changed.append(self)
+        else:
+            self._invalidate_self()
 
         old_value = self._value
         self._value = new_value
-        NodeValueEvent(self, old_value, new_value)
+        graph._revision = self._changed_at = next(graph._revisions)
+        if graph._lazy:
+            # Otherwise the new value would be replaced when the Node is
+            # next checked against its arguments.
+            self._verified_at = self._changed_at
+        if graph._dispatch[NodeValueEvent]:
+            NodeValueEvent(self, old_value, new_value)
 
         self.state = Node.State.VALID
+        _update_observed(graph)
 
     @property
     def lazy_value(self):
         """Return the value of this Node if it is valid, or None if it
-        is invalid.
+        is invalid (or, in a lazily invalidated Graph, may be outdated).
         """
 
-        if self.state == Node.State.VALID:
+        if not _unverified(self):
             return self.value
         else:
             return None
 
+    def observe(self, callback):
+        """Call callback with the new value of this Node whenever it
+        changes.
+
+        Observed Nodes are recomputed eagerly: once a change to a Node
+        they depend on has been made (or, in a Batch, once the batch
+        exits), each invalid observed Node is recomputed, and its
+        callbacks are called if its value differs from the previous
+        one. The rest of the Graph is still computed lazily. An
+        observed Node is kept by its Graph, even by collect(), until
+        every callback is removed with unobserve().
+
+        An observed Node which must compute an asynchronous Node is
+        instead recomputed with avalue() by a task, which is started
+        in the event loop running on the thread making the change. If
+        no event loop is running, it is only recomputed when read.
+        """
+
+        self._graph._observed.setdefault(self, []).append(callback)
+
+    def unobserve(self, callback):
+        """Stop calling callback when the value of this Node changes."""
+
+        callbacks = self._graph._observed.get(self, [])
+        if callback not in callbacks:
+            raise ValueError(f"'{callback}' does not observe '{self}'.")
+        callbacks.remove(callback)
+        if not callbacks:
+            del self._graph._observed[self]
+
+
+Node._default_key = True
+
+
+def _values_equal(a, b):
+    """Return whether a Node value is unchanged, including for values
+    such as NumPy arrays which compare elementwise.
+
+    A NumPy array is only equal to an array of the same class, shape,
+    and dtype, so that replacing a value with one of a different type
+    is never ignored.
+    """
+
+    if a is b:
+        return True
+    # Without NumPy imported, no value can be an array.
+    np = sys.modules.get("numpy")
+    if np is not None and (isinstance(a, np.ndarray)
+            or isinstance(b, np.ndarray)):
+        return (a.__class__ is b.__class__ and a.shape == b.shape
+                and a.dtype == b.dtype and bool(np.array_equal(a, b)))
+    try:
+        return bool(a == b)
+    except ValueError:
+        # The truth value of an array with several elements is
+        # ambiguous, and arrays of different shapes may not compare.
+        if (getattr(a, "shape", None) != getattr(b, "shape", None)
+                or getattr(a, "dtype", None) != getattr(b, "dtype", None)):
+            return False
+        return bool((a == b).all())
+
+
+def _invalidate(nodes):
+    """Invalidate the valid Nodes in nodes and every valid Node which
+    depends on them, and return the invalidated Nodes.
+
+    The affected Nodes are found in a single iterative traversal, and
+    a NodeStateEvent is fired for each of them once all of them have
+    been marked invalid. In a lazily invalidated Graph, only the Nodes
+    in nodes are invalidated, and every other Node is checked against
+    its arguments when it is next read.
+    """
+
+    valid = Node.State.VALID
+    invalid = Node.State.INVALID
+
+    # Nodes are marked as they are found, so that each Node is visited
+    # once even if it is reachable along several paths.
+    cone = []
+    for node in nodes:
+        if node._state is valid:
+            node._state = invalid
+            cone.append(node)
+    lazy = cone and cone[0]._graph._lazy
+    try:
+        for node in cone:
+            if not node._invalidatable:
+                raise TypeError("Cannot invalidate the value of a "
+                        f"{node.__class__.__name__}.")
+            if lazy:
+                continue
+            for dependent in node._dependents:
+                if dependent._state is valid:
+                    dependent._state = invalid
+                    cone.append(dependent)
+    except BaseException:
+        for node in cone:
+            node._state = valid
+        raise
+
+    if cone:
+        graph = cone[0]._graph
+        if lazy:
+            # Every Node verified before now must be verified again.
+            graph._revision = graph._written_at = next(graph._revisions)
+        if graph._observed:
+            graph._observed_stale = True
+        if graph.profiler is not None:
+            graph.profiler._invalidated(cone)
+        if graph._dispatch[NodeStateEvent]:
+            for node in cone:
+                NodeStateEvent(node, valid, invalid)
+
+    return cone
+
+
+def _check_invalidatable(node, checked):
+    """Raise the TypeError which invalidating node (which must be valid)
+    would raise, without invalidating any Node.
+
+    Valid Nodes added to checked are not checked again, so that checking
+    several Nodes with the same checked set takes time proportional to
+    the number of Nodes depending on any of them.
+    """
+
+    valid = Node.State.VALID
+    lazy = node._graph._lazy
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if not current._invalidatable:
+            raise TypeError("Cannot invalidate the value of a "
+                    f"{current.__class__.__name__}.")
+        if lazy and current is not node:
+            # Only the direct dependents are invalidated.
+            continue
+        for dependent in current._dependents:
+            if dependent._state is valid and dependent not in checked:
+                checked.add(dependent)
+                stack.append(dependent)
+
+
+def _update_observed(graph):
+    """Recompute the invalid observed Nodes of graph, and call the
+    callbacks of those whose value changed.
+
+    Nothing is done inside a Batch or while Nodes are being computed,
+    since the values of the observed Nodes may not be final yet.
+
+    An exception raised while computing an observed Node or calling a
+    callback does not stop the other observed Nodes from being updated.
+    Once all of them have been, the exception is raised, or if there
+    were several, an ExceptionGroup of them.
+    """
+
+    if (not graph._observed_stale or graph._batch is not None
+            or graph.call_stack.stack):
+        return
+    graph._observed_stale = False
+
+    errors = []
+    for node, callbacks in list(graph._observed.items()):
+        if not _unverified(node) or node in graph._observed_tasks:
+            continue
+        try:
+            if graph._has_async and any(
+                    n._async for n in _invalid_cone(node)):
+                _start_observed_task(graph, node)
+                continue
+            changed_at = node._changed_at
+            value = node.value
+        except Exception as e:
+            errors.append(e)
+            continue
+        if node._changed_at != changed_at:
+            for callback in list(callbacks):
+                try:
+                    callback(value)
+                except Exception as e:
+                    errors.append(e)
+
+    if len(errors) == 1:
+        raise errors[0]
+    if errors:
+        raise ExceptionGroup("Updating observed Nodes failed.", errors)
+
+
+def _start_observed_task(graph, node):
+    """Start a task updating an observed Node which depends on
+    asynchronous Nodes, if an event loop is running.
+    """
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    graph._observed_tasks[node] = loop.create_task(
+            _update_observed_async(graph, node))
+
+
+async def _update_observed_async(graph, node):
+    """Recompute an observed Node with avalue() until it is valid, and
+    call its callbacks if its value changed.
+
+    Exceptions are passed to the exception handler of the event loop,
+    since nothing awaits the task.
+    """
+
+    def report(exception):
+        asyncio.get_running_loop().call_exception_handler({
+            "message": f"Updating the observed Node '{node}' failed.",
+            "exception": exception,
+        })
+
+    try:
+        while _unverified(node) and node in graph._observed:
+            changed_at = node._changed_at
+            try:
+                value = await node.avalue()
+            except Exception as e:
+                report(e)
+                return
+            if node._changed_at != changed_at:
+                for callback in list(graph._observed.get(node, ())):
+                    try:
+                        callback(value)
+                    except Exception as e:
+                        report(e)
+    finally:
+        del graph._observed_tasks[node]
+
+
+def _collected_error(node):
+    """Return the error raised when a Node removed by Graph.collect() is
+    used.
+    """
+
+    return ValueError(f"'{node}' was removed from its Graph by collect().")
+
+
+def _unverified(node):
+    """Return whether node is invalid, or, in a lazily invalidated
+    Graph, may be outdated because it has not been checked against its
+    arguments since a Node changed.
+    """
+
+    if node._state is not Node.State.VALID:
+        return True
+    return (node._verified_at < node._graph._written_at
+            and bool(node._args or node._kwargs))
+
+
+def _invalid_cone(root):
+    """Return root and the invalid (or unverified) Nodes it depends on,
+    ordered so that each Node comes after all of its invalid arguments.
+
+    Raise a DependencyCycleError if the invalid Nodes depend on each
+    other cyclically.
+    """
+
+    if root._state is Node.State.COLLECTED:
+        raise _collected_error(root)
+    order = []
+    visited = {root}
+
+    # Each frame is a Node and an iterator over its remaining arguments,
+    # as in _evaluate.
+    frames = [(root, itertools.chain(root._args, root._kwargs.values()))]
+    on_path = {root}
+    while frames:
+        node, remaining_args = frames[-1]
+        for arg in remaining_args:
+            if not _unverified(arg):
+                continue
+            if arg._state is Node.State.COLLECTED:
+                raise _collected_error(arg)
+            if arg in on_path:
+                raise DependencyCycleError([n for n, _ in frames] + [arg])
+            if arg not in visited:
+                visited.add(arg)
+                on_path.add(arg)
+                args = itertools.chain(arg._args, arg._kwargs.values())
+                frames.append((arg, args))
+                break
+        else:
+            frames.pop()
+            on_path.remove(node)
+            order.append(node)
+    return order
+
+
+def _compute_value(node):
+    """Return the value of node computed from its arguments, or loaded
+    from the cache of its Graph.
+    """
+
+    cache = node._graph.cache
+    if cache is None:
+        return node.compute_value(*node._args, **node._kwargs)
+    return cache.compute(node)
+
+
+def _evaluate(root):
+    """Compute the value of root, first computing the values of any
+    invalid Nodes it depends on.
+
+    Dependencies are visited depth-first in argument order, using an
+    explicit stack instead of recursion, so the depth of the graph is
+    not limited by the Python recursion limit. Each frame on the stack
+    mirrors a frame on the NodeCallStack, so the same events are fired
+    (and dependency cycles detected) as if every Node had computed its
+    arguments recursively.
+    """
+
+    graph = root._graph
+    call_stack = graph.call_stack
+
+    # Each frame is a Node, an iterator over its remaining arguments,
+    # and, if a Profiler is enabled, the time the frame was entered,
+    # which the computation of its arguments is charged to.
+    frames = []
+
+    def enter(node):
+        """Push a frame for node and return True, or return False if
+        another thread computed its value in the meantime.
+        """
+
+        if node._state is Node.State.COLLECTED:
+            raise _collected_error(node)
+        if node in call_stack._nodes:
+            # Raise a DependencyCycleError.
+            call_stack._push(node)
+        if not graph._claim(node):
+            return False
+        try:
+            call_stack._push(node)
+        except BaseException:
+            graph._release(node)
+            raise
+        args = itertools.chain(node._args, node._kwargs.values())
+        entered = None if graph.profiler is None else time.perf_counter()
+        frames.append((node, args, entered))
+        node.state = Node.State.PENDING
+        return True
+
+    try:
+        enter(root)
+        while frames:
+            node, remaining_args, entered = frames[-1]
+            for arg in remaining_args:
+                if _unverified(arg) and enter(arg):
+                    break
+            else:
+                # All arguments are valid, so compute_value will not
+                # recurse (unless it reads Nodes which are not arguments).
+                if node._needs_recompute():
+                    if node._async:
+                        raise TypeError("Use avalue() to compute the value "
+                                f"of a {node.__class__.__name__}.")
+                    profiler = graph.profiler
+                    if profiler is None:
+                        node.value = _compute_value(node)
+                    else:
+                        token = profiler._begin(node, entered=entered)
+                        try:
+                            value = _compute_value(node)
+                        finally:
+                            profiler._end(node, token)
+                        node.value = value
+                else:
+                    if graph.profiler is not None:
+                        graph.profiler._hit(node)
+                    node.state = Node.State.VALID
+                node._verified_at = graph._revision
+                frames.pop()
+                call_stack._pop(node)
+                graph._release(node)
+    except BaseException:
+        for node, _, _ in reversed(frames):
+            call_stack._pop(node)
+            graph._release(node)
+        raise
+
+
+class Graph:
+    """An independent graph of Nodes.
+
+    A Graph owns the memo table indexing its Nodes, its call stack, and
+    its event listeners. Nodes are created in the current Graph, which
+    is selected with a context variable: using a Graph as a context
+    manager makes it current, and otherwise a default Graph is used.
+
+    Nodes can only depend on Nodes in the same Graph. Once nothing
+    refers to a Graph or its Nodes, all of them can be freed together.
+
+    Several threads may read Node values concurrently. Each thread has
+    its own call stack, and a thread which needs a Node being computed
+    by another thread waits for that computation instead of repeating
+    it. Reading a valid Node takes no locks.
+
+    By default, changing the value of a Node invalidates every Node
+    which depends on it at once. If lazy is true, changing a value takes
+    constant time instead: the Graph only records the revision of the
+    change, and a Node read afterwards first checks its arguments, in
+    turn, and is recomputed only if one of their values changed since
+    it was last verified. This suits inputs which change many times
+    between reads, at the cost of checking the arguments of every Node
+    which is read after a change, but each Node is only checked once per
+    change. Outdated Nodes keep the VALID state until they are read.
+    """
+
+    def __init__(self, memo=None, cache=None, lazy=False):
+        self.memo = UnboundedMemo() if memo is None else memo
+        """Index memoized Nodes by their keys (see Memo)."""
+
+        self.cache = cache
+        """A PersistentCache for computed values, or None."""
+
+        self._local = threading.local()
+
+        # Map each Node being computed to _CLAIMED, or, once another
+        # thread waits for it, to an Event set when the computation
+        # finishes.
+        self._computing = {}
+        self._lock = threading.Lock()
+
+        self.listeners = EventListeners(_global_listeners)
+        """Listeners for the events of Nodes in this Graph."""
+
+        self._dispatch = self.listeners.dispatch
+
+        self._revisions = itertools.count(1)
+        self._revision = 0
+        """The revision at which the value of a Node last changed."""
+
+        self._lazy = bool(lazy)
+
+        # Nodes verified before this revision must be checked against
+        # their arguments before being read. Nodes in a Graph which is
+        # not lazy are never verified before -1.
+        self._written_at = -1
+
+        self._structure_version = 0
+        """Incremented whenever the arguments of an existing Node change."""
+
+        self._instance_counter = itertools.count()
+        """Numbers Nodes which are never memoized, such as VarNodes."""
+
+        self._batch = None
+        """The outermost Batch which has not exited yet."""
+
+        self.profiler = None
+        """The Profiler recording statistics of this Graph, or None."""
+
+        # Map each pinned Node to the number of times it was pinned.
+        self._pins = {}
+
+        # Map each observed Node to its callbacks, and each observed
+        # Node being updated by a task to the task.
+        self._observed = {}
+        self._observed_stale = False
+        self._observed_tasks = {}
+
+        # Whether any asynchronous Node was created in this Graph.
+        self._has_async = False
+
+    @property
+    def lazy(self):
+        """Whether changing a value leaves dependents to be checked when
+        they are next read, instead of invalidating them at once.
+        """
+
+        return self._lazy
+
+    @staticmethod
+    def current():
+        """Return the current Graph."""
+
+        return _current_graph.get()
+
+    def __enter__(self):
+        # Each thread and task has its own context, so the tokens for
+        # restoring the previous Graph are kept in the context too.
+        token = _current_graph.set(self)
+        _graph_tokens.set((*_graph_tokens.get(), token))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        *tokens, token = _graph_tokens.get()
+        _graph_tokens.set(tuple(tokens))
+        _current_graph.reset(token)
+
+    @property
+    def call_stack(self):
+        """The NodeCallStack of the current thread."""
+
+        try:
+            return self._local.call_stack
+        except AttributeError:
+            self._local.call_stack = call_stack = NodeCallStack()
+            return call_stack
+
+    def set_memo(self, memo):
+        """Replace the memo table (an instance of a Memo subclass),
+        keeping the Nodes memoized so far.
+        """
+
+        memo.update(self.memo)
+        if memo.weak_dependents != self.memo.weak_dependents:
+            cls = weakref.WeakSet if memo.weak_dependents else set
+            for key in memo:
+                try:
+                    node = memo[key]
+                except KeyError:
+                    continue
+                if node._dependents:
+                    node._dependents = cls(node._dependents)
+        self.memo = memo
+
+    def pin(self, *nodes):
+        """Keep nodes, and every Node they depend on, from being removed
+        by collect(). A Node pinned several times stays pinned until it
+        is unpinned as many times.
+        """
+
+        for node in nodes:
+            if node._graph is not self:
+                raise ValueError(f"Cannot pin '{node}', which belongs to "
+                        "another Graph.")
+            self._pins[node] = self._pins.get(node, 0) + 1
+
+    def unpin(self, *nodes):
+        """Undo one call to pin() for each of nodes."""
+
+        for node in nodes:
+            count = self._pins.get(node)
+            if count is None:
+                raise ValueError(f"'{node}' is not pinned.")
+            if count == 1:
+                del self._pins[node]
+            else:
+                self._pins[node] = count - 1
+
+    def collect(self):
+        """Remove every memoized Node which is not pinned and which no
+        pinned Node depends on, and return the number of Nodes removed.
+
+        Removed Nodes are unlinked from the dependents of their
+        arguments, so they no longer keep each other alive, and their
+        values are dropped. Since they are no longer invalidated when
+        their arguments change, they enter the COLLECTED state, in which
+        reading or changing their values, or using them as arguments,
+        raises a ValueError. Observed Nodes and Nodes being computed are
+        kept. The time taken is proportional to the number of Nodes and
+        arguments in the Graph.
+        """
+
+        with self._lock:
+            stack = [*self._pins, *self._observed, *self._computing]
+        reachable = set()
+        while stack:
+            node = stack.pop()
+            if node not in reachable:
+                reachable.add(node)
+                stack.extend(node._args)
+                stack.extend(node._kwargs.values())
+
+        memo = self.memo
+        removed = []
+        for key in memo:
+            try:
+                node = memo[key]
+            except KeyError:
+                # A weak memo may lose Nodes while it is iterated.
+                continue
+            if node not in reachable:
+                del memo[key]
+                removed.append(node)
+
+        for node in removed:
+            for arg in itertools.chain(node._args, node._kwargs.values()):
+                if arg._dependents:
+                    arg._dependents.discard(node)
+        for node in removed:
+            node._dependents = ()
+            node._value = None
+            node._verified_at = -1
+            node.state = Node.State.COLLECTED
+
+        for node in reachable:
+            creator = getattr(node, "_created_by", None)
+            if creator is not None and creator not in reachable:
+                del node._created_by
+
+        return len(removed)
+
+    def _claim(self, node):
+        """Wait until no other thread is computing node. Then, if node
+        is still not valid, claim it for the current thread and return
+        True; otherwise, return False.
+        """
+
+        while True:
+            with self._lock:
+                if not _unverified(node):
+                    return False
+                done = self._computing.get(node)
+                if done is None:
+                    self._computing[node] = _CLAIMED
+                    return True
+                if done is _CLAIMED:
+                    # Only create an Event once a thread has to wait.
+                    done = self._computing[node] = threading.Event()
+            done.wait()
+
+    def _release(self, node):
+        """Release a Node claimed with _claim."""
+
+        with self._lock:
+            done = self._computing.pop(node)
+        if done is not _CLAIMED:
+            done.set()
+
 
 class NodeCallStack:
     """Call stack for currently executing nodes."""
 
-    stack = ObservableList()
-    _nodes = set()
+    def __init__(self):
+        self.stack = []
+        self._nodes = set()
 
-    @staticmethod
-    def _on_stack_change(mutation):
-        for node in mutation.added:
-            NodeCallStackPushEvent(node)
-        for node in reversed(mutation.removed):
-            NodeCallStackPopEvent(node)
-
-    @classmethod
-    def _push(cls, node):
-        if node in cls._nodes:
-            raise DependencyCycleError(cls.stack + [node])
+    def _push(self, node):
+        if node in self._nodes:
+            raise DependencyCycleError([*self.stack, node])
         else:
-            cls._nodes.add(node)
-            cls.stack.append(node)
+            self._nodes.add(node)
+            self.stack.append(node)
+            if node._graph._dispatch[NodeCallStackPushEvent]:
+                NodeCallStackPushEvent(node)
 
-    @classmethod
-    def _pop(cls, node):
-        if not cls.stack:
+    def _pop(self, node):
+        if not self.stack:
             raise IndexError(f"Cannot pop '{node}' from empty call stack.")
-        elif node != cls.stack[-1]:
+        elif node != self.stack[-1]:
             raise TypeError("super().__init__ not called for node "
-                    f"{cls.stack[-1]}.")
+                    f"{self.stack[-1]}.")
         else:
-            cls._nodes.remove(node)
-            cls.stack.pop()
+            self._nodes.remove(node)
+            self.stack.pop()
+            if node._graph._dispatch[NodeCallStackPopEvent]:
+                NodeCallStackPopEvent(node)
+
 
-NodeCallStack.stack.listeners.add(NodeCallStack._on_stack_change)
+_current_graph = contextvars.ContextVar("lameflow_graph", default=Graph())
 
+# The tokens for restoring the current Graph when each Graph entered in
+# the current context exits, innermost last.
+_graph_tokens = contextvars.ContextVar("lameflow_graph_tokens", default=())
 
-class _NodeStackFrame:
-    """Context manager which creates a stack frame for the currently
-    executing node and detects dependency cycles.
+
+class Batch:
+    """Context manager which defers the invalidation caused by changing
+    Node values until the batch exits.
+
+    On exit, every Node which depends on a changed Node is invalidated
+    in a single pass, however many of its inputs changed, and one
+    NodeBatchEvent is fired. Until then, reading a dependent Node may
+    return a value computed from the old inputs.
+
+    Changing a value in a batch raises the TypeError that committing the
+    batch would raise if it invalidated a Node which cannot be
+    invalidated, before the value is changed, as outside of a batch.
+
+    Nested batches are committed when the outermost batch exits. A
+    batch applies to the Graph which is current when it is entered.
     """
 
-    def __init__(self, node):
-        self.node = node
+    def __init__(self):
+        self._changed = []
+        # Nodes which may be invalidated on exit (see
+        # _check_invalidatable).
+        self._checked = set()
+        self._graph = None
+        self._outer = None
 
     def __enter__(self):
-        NodeCallStack._push(self.node)
+        self._graph = graph = Graph.current()
+        if graph._batch is None:
+            graph._batch = self
+        else:
+            self._outer = graph._batch
+        return self
 
     def __exit__(self, exc_type, exc_value, traceback):
-        NodeCallStack._pop(self.node)
+        if self._outer is not None:
+            self._outer = None
+            return
+
+        graph = self._graph
+        graph._batch = None
+        changed = list(dict.fromkeys(self._changed))
+        self._changed = []
+        self._checked = set()
+
+        dependents = [d for node in changed for d in node._dependents]
+        invalidated = _invalidate(dependents)
+
+        if graph._dispatch[NodeBatchEvent]:
+            NodeBatchEvent(graph, changed, invalidated)
+
+        _update_observed(graph)
 
 
 class DependencyCycleError(Exception):
@@ -0,0 +1,149 @@
+"""Evaluate independent Nodes concurrently on a thread pool."""
+
+__all__ = ["parallel_value"]
+
+from concurrent.futures import (
+        FIRST_COMPLETED, ThreadPoolExecutor, wait)
+import contextvars
+import itertools
+
+from .node import *
+from .node import _invalid_cone, _unverified
+
+
+def parallel_value(node, executor=None, max_workers=None):
+    """Get the value of node, computing invalid Nodes whose arguments
+    are valid concurrently.
+
+    compute_value is called on the threads of executor (or, if no
+    executor is given, a new ThreadPoolExecutor with max_workers
+    threads), which only helps if it releases the GIL. Everything else,
+    including all state changes and events, happens on the calling
+    thread, and a Node is only computed after all of its arguments are
+    valid. Nodes are not pushed to the NodeCallStack, but dependency
+    cycles are still detected before any Node is computed. Other threads
+    reading the value of a Node which is about to be computed wait for
+    it, instead of computing it again.
+
+    compute_value must only read the values of Nodes which are
+    arguments, since any other Node may be invalid.
+    """
+
+    if not _unverified(node):
+        return node.value
+
+    if executor is None:
+        with ThreadPoolExecutor(max_workers) as executor:
+            return _Schedule(node, executor).run()
+    else:
+        return _Schedule(node, executor).run()
+
+
+class _Schedule:
+    """Track which invalid Nodes are waiting for their arguments."""
+
+    def __init__(self, root, executor):
+        self.root = root
+        self.executor = executor
+
+        order = _invalid_cone(root)
+
+        # Map each Node to the number of its invalid arguments which
+        # have not been computed yet, and to its invalid dependents.
+        self.waiting = {}
+        self.dependents = {n: [] for n in order}
+        for node in order:
+            args = set(itertools.chain(node._args, node._kwargs.values()))
+            invalid_args = [a for a in args if a in self.dependents]
+            self.waiting[node] = len(invalid_args)
+            for arg in invalid_args:
+                self.dependents[arg].append(node)
+
+        self.order = order
+        self.ready = [n for n in order if not self.waiting[n]]
+        self.running = {}
+        self.claimed = set()
+
+    def _claim(self):
+        """Claim the Nodes to compute, so that other threads wait for
+        them, skipping those which other threads computed meanwhile.
+        """
+
+        # Claim dependents before their arguments, like _evaluate.
+        graph = self.root._graph
+        for node in reversed(self.order):
+            if graph._claim(node):
+                self.claimed.add(node)
+
+    def run(self):
+        try:
+            self._claim()
+            while self.ready or self.running:
+                while self.ready:
+                    self._start(self.ready.pop())
+                if self.running:
+                    done, _ = wait(self.running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._complete(
+                                self.running.pop(future), future.result())
+        finally:
+            for future in self.running:
+                future.cancel()
+            for node in self.claimed:
+                node._graph._release(node)
+            self.claimed.clear()
+        return self.root.value
+
+    def _start(self, node):
+        if node not in self.claimed:
+            # Computed by another thread.
+            self._finish(node)
+            return
+
+        node.state = Node.State.PENDING
+        if node._needs_recompute():
+            if node._async:
+                raise TypeError("Use avalue() to compute the value "
+                        f"of a {node.__class__.__name__}.")
+            cache = node._graph.cache
+            if cache is not None:
+                found, value = cache.load(node)
+                if found:
+                    node.value = value
+                    self._finish(node)
+                    return
+            # Run in the current context, so that any Nodes created by
+            # compute_value belong to the current Graph.
+            context = contextvars.copy_context()
+            profiler = node._graph.profiler
+            if profiler is None:
+                future = self.executor.submit(context.run,
+                        node.compute_value, *node._args, **node._kwargs)
+            else:
+                future = self.executor.submit(context.run,
+                        profiler._compute, node, node.compute_value,
+                        *node._args, **node._kwargs)
+            self.running[future] = node
+        else:
+            if node._graph.profiler is not None:
+                node._graph.profiler._hit(node)
+            node.state = Node.State.VALID
+            self._finish(node)
+
+    def _complete(self, node, value):
+        """Store the value of a Node computed on the executor."""
+
+        node.value = value
+        if node._graph.cache is not None:
+            node._graph.cache.store(node, node.value)
+        self._finish(node)
+
+    def _finish(self, node):
+        if node in self.claimed:
+            node._verified_at = node._graph._revision
+            self.claimed.remove(node)
+            node._graph._release(node)
+        for dependent in self.dependents[node]:
+            self.waiting[dependent] -= 1
+            if not self.waiting[dependent]:
+                self.ready.append(dependent)
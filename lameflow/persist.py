@@ -0,0 +1,419 @@
+"""Persist computed Node values on disk across processes."""
+
+__all__ = ["PersistentCache"]
+
+import functools
+import hashlib
+import itertools
+import pickle
+import sqlite3
+import threading
+import time
+import types
+import weakref
+
+from .node import *
+from .core import IndependentNode
+
+
+def _update_code(h, code):
+    """Hash the parts of a code object which determine its behavior."""
+
+    h.update(code.co_code)
+    h.update(repr(code.co_names).encode())
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            _update_code(h, const)
+        else:
+            h.update(_const_repr(const).encode())
+
+
+def _const_repr(const):
+    """Return the repr of a code constant, with the elements of
+    frozensets sorted so that it is the same in every process.
+    """
+
+    if isinstance(const, frozenset):
+        return f"frozenset({sorted(map(_const_repr, const))})"
+    if isinstance(const, tuple):
+        return f"({', '.join(map(_const_repr, const))},)"
+    return repr(const)
+
+
+def _global_names(code):
+    """Return the names used by a code object and the code objects
+    nested in it.
+    """
+
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _global_names(const)
+    return names
+
+
+def _function_fingerprint(func, _seen=None):
+    """Return a fingerprint of a function's name, code, defaults,
+    closure, and the functions and constants in the globals its code
+    uses, or None if some of them have no fingerprint.
+
+    Other globals, such as lists and dicts, are assumed to be state
+    which does not determine the result of the function, just as the
+    Graph does not recompute a Node when they change.
+    """
+
+    h = hashlib.sha256()
+    h.update(f"{func.__module__}.{func.__qualname__}".encode())
+    code = getattr(func, "__code__", None)
+    if code is None:
+        return h.hexdigest()
+
+    # A function may refer to itself, through its globals or closure.
+    seen = set() if _seen is None else _seen
+    if id(func) in seen:
+        return h.hexdigest()
+    seen.add(id(func))
+
+    _update_code(h, code)
+
+    closure = getattr(func, "__closure__", None) or ()
+    values = [getattr(func, "__defaults__", None),
+            getattr(func, "__kwdefaults__", None)]
+    for cell in closure:
+        try:
+            values.append(cell.cell_contents)
+        except ValueError:
+            # The variable is not assigned yet.
+            values.append(_EMPTY_CELL)
+    for value in values:
+        fingerprint = _value_fingerprint(value, seen)
+        if fingerprint is None:
+            return None
+        h.update(fingerprint.encode())
+
+    func_globals = getattr(func, "__globals__", {})
+    for name in sorted(_global_names(code)):
+        if name not in func_globals:
+            continue
+        value = func_globals[name]
+        if isinstance(value, types.ModuleType):
+            # Only the names of modules and classes are used.
+            fingerprint = value.__name__
+        elif isinstance(value, type):
+            fingerprint = f"{value.__module__}.{value.__qualname__}"
+        elif not isinstance(value, _GLOBAL_TYPES):
+            continue
+        else:
+            fingerprint = _value_fingerprint(value, seen)
+            if fingerprint is None:
+                return None
+        h.update(f"{name}={fingerprint}".encode())
+    return h.hexdigest()
+
+
+# The types of globals which are part of the fingerprint of a function
+# using them.
+_GLOBAL_TYPES = (
+    types.FunctionType, types.MethodType, types.BuiltinFunctionType,
+    type(None), bool, int, float, complex, str, bytes, tuple, frozenset,
+)
+
+# Stands in for the contents of an unassigned closure variable.
+_EMPTY_CELL = "<empty cell>"
+
+
+class _Unordered(tuple):
+    """The elements of a set or frozenset, in a fixed order."""
+
+    __slots__ = ()
+
+
+def _canonical(value):
+    """Return value with every set in it (including in lists, tuples,
+    and dicts) replaced by its elements in a fixed order, so that it
+    pickles to the same bytes in every process.
+    """
+
+    cls = value.__class__
+    if cls is set or cls is frozenset:
+        items = [pickle.dumps(_canonical(v), protocol=4) for v in value]
+        return _Unordered((cls.__name__, *sorted(items)))
+    if cls is list or cls is tuple:
+        return cls(_canonical(v) for v in value)
+    if cls is dict:
+        return {_canonical(k): _canonical(v) for k, v in value.items()}
+    return value
+
+
+def _value_fingerprint(value, _seen=None):
+    """Return a fingerprint of a value, or None if it has none."""
+
+    if isinstance(value, types.FunctionType):
+        return _function_fingerprint(value, _seen)
+    if isinstance(value, types.MethodType):
+        func = _function_fingerprint(value.__func__, _seen)
+        instance = _value_fingerprint(value.__self__, _seen)
+        if func is None or instance is None:
+            return None
+        return hashlib.sha256(f"{func}.{instance}".encode()).hexdigest()
+    if isinstance(value, types.BuiltinFunctionType):
+        return _function_fingerprint(value)
+    if isinstance(value, functools.partial):
+        # Pickling a partial would only record the name of its function.
+        parts = [value.func, value.args, value.keywords]
+        fingerprints = [_value_fingerprint(v, _seen) for v in parts]
+        if None in fingerprints:
+            return None
+        return hashlib.sha256(".".join(fingerprints).encode()).hexdigest()
+
+    h = hashlib.sha256()
+    call = getattr(value.__class__, "__call__", None)
+    if (isinstance(call, types.FunctionType)
+            and not isinstance(value, type)):
+        # A callable object is computed by the code of its class.
+        fingerprint = _function_fingerprint(call, _seen)
+        if fingerprint is None:
+            return None
+        h.update(fingerprint.encode())
+    try:
+        data = pickle.dumps(_canonical(value), protocol=4)
+    except Exception:
+        return None
+    h.update(data)
+    return h.hexdigest()
+
+
+def _owner(node):
+    """Return the name of the function or class computing a Node's
+    value, which entries can be invalidated by.
+    """
+
+    func = node._kwargs.get("__func")
+    if func is not None:
+        return _qualified_name(func.value)
+    return _qualified_name(node.__class__)
+
+
+def _qualified_name(obj):
+    """Return the fully qualified name of a function or class, or of the
+    class of a callable object which has no name, such as a partial.
+    """
+
+    if not hasattr(obj, "__qualname__"):
+        obj = obj.__class__
+    return f"{obj.__module__}.{obj.__qualname__}"
+
+
+class PersistentCache:
+    """Store computed Node values in an sqlite database, so that they
+    survive restarts of the process.
+
+    Values are keyed by the fingerprint of a Node: a hash of its class,
+    the code computing its value (with its defaults, its closure, and
+    the globals it uses), and the fingerprints of its arguments (or, for
+    IndependentNodes, of its value). The fingerprint changes whenever
+    the code computing the Node or the values of its inputs change.
+    Nodes whose inputs, values, or functions cannot be fingerprinted
+    are not cached.
+
+    If max_bytes is given, the least recently used values are evicted
+    to keep the total size of the stored values below it.
+
+    To use a PersistentCache, pass it to a Graph, or assign it to the
+    cache attribute of an existing Graph.
+    """
+
+    def __init__(self, path, max_bytes=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS node_values (
+                    fingerprint TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    used REAL NOT NULL
+                )""")
+            self._db.execute("""
+                CREATE INDEX IF NOT EXISTS node_values_used
+                ON node_values (used)""")
+        self._bytes = self._total_size()
+
+        # Fingerprints of Nodes, with the revisions they were computed
+        # at.
+        self._fingerprints = weakref.WeakKeyDictionary()
+
+    def __repr__(self):
+        return (f"{self.__class__.__name__}({self.path!r}, "
+                f"hits={self.hits}, misses={self.misses}, "
+                f"bytes={self._bytes})")
+
+    def close(self):
+        self._db.close()
+
+    def fingerprint(self, node):
+        """Return the fingerprint of a Node whose arguments are valid, or
+        None if some input value cannot be pickled.
+        """
+
+        # Find the fingerprints of the Node's arguments first, without
+        # recursion, as in _evaluate.
+        args = itertools.chain(node._args, node._kwargs.values())
+        frames = [(node, args)]
+        while frames:
+            current, remaining_args = frames[-1]
+            for arg in remaining_args:
+                if self._cached_fingerprint(arg) is False:
+                    args = itertools.chain(arg._args, arg._kwargs.values())
+                    frames.append((arg, args))
+                    break
+            else:
+                frames.pop()
+                fingerprint = self._compute_fingerprint(current)
+                self._fingerprints[current] = (_stamp(current), fingerprint)
+        return self._fingerprints[node][1]
+
+    def _cached_fingerprint(self, node):
+        """Return the stored fingerprint of a Node, or False if it must
+        be computed.
+        """
+
+        try:
+            stamp, fingerprint = self._fingerprints[node]
+        except KeyError:
+            return False
+        return fingerprint if stamp == _stamp(node) else False
+
+    def _compute_fingerprint(self, node):
+        if isinstance(node, IndependentNode):
+            value = _value_fingerprint(node.value)
+            if value is None:
+                return None
+            parts = [value]
+        else:
+            parts = []
+            for name, arg in itertools.chain(
+                    enumerate(node._args), sorted(node._kwargs.items())):
+                arg_fingerprint = self._cached_fingerprint(arg)
+                if arg_fingerprint is None:
+                    return None
+                parts.append(f"{name}={arg_fingerprint}")
+            code = _function_fingerprint(node.compute_value)
+            if code is None:
+                return None
+            parts.append(code)
+
+        h = hashlib.sha256()
+        cls = node.__class__
+        h.update(f"{cls.__module__}.{cls.__qualname__}".encode())
+        for part in parts:
+            h.update(part.encode())
+        return h.hexdigest()
+
+    def load(self, node):
+        """Return (True, value) if the value of node, whose arguments
+        must be valid, is stored; otherwise, return (False, None).
+        """
+
+        fingerprint = self.fingerprint(node)
+        if fingerprint is None:
+            return False, None
+        with self._lock, self._db:
+            row = self._db.execute(
+                    "SELECT value FROM node_values WHERE fingerprint = ?",
+                    (fingerprint,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return False, None
+            self._db.execute(
+                    "UPDATE node_values SET used = ? WHERE fingerprint = ?",
+                    (time.time(), fingerprint))
+        self.hits += 1
+        return True, pickle.loads(row[0])
+
+    def store(self, node, value):
+        """Store the value computed for node, if it can be pickled."""
+
+        fingerprint = self.fingerprint(node)
+        if fingerprint is None:
+            return
+        try:
+            data = pickle.dumps(value, protocol=4)
+        except Exception:
+            return
+        with self._lock, self._db:
+            old = self._db.execute(
+                    "SELECT size FROM node_values WHERE fingerprint = ?",
+                    (fingerprint,)).fetchone()
+            if old is not None:
+                self._bytes -= old[0]
+            self._db.execute(
+                    "INSERT OR REPLACE INTO node_values "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (fingerprint, _owner(node), data, len(data),
+                        time.time()))
+            self._bytes += len(data)
+            self._evict()
+
+    def compute(self, node):
+        """Return the stored value of node, or compute and store it."""
+
+        found, value = self.load(node)
+        if not found:
+            value = node.compute_value(*node._args, **node._kwargs)
+            self.store(node, value)
+        return value
+
+    def _total_size(self):
+        query = "SELECT COALESCE(SUM(size), 0) FROM node_values"
+        return self._db.execute(query).fetchone()[0]
+
+    def _evict(self):
+        if self.max_bytes is None or self._bytes <= self.max_bytes:
+            return
+        rows = self._db.execute(
+                "SELECT fingerprint, size FROM node_values ORDER BY used")
+        evicted = []
+        for fingerprint, size in rows:
+            if self._bytes <= self.max_bytes:
+                break
+            evicted.append((fingerprint,))
+            self._bytes -= size
+        self._db.executemany(
+                "DELETE FROM node_values WHERE fingerprint = ?", evicted)
+
+    def invalidate(self, owner):
+        """Delete the stored values computed by a function or Node class
+        (or its fully qualified name), such as after changing its code.
+
+        Changing the code of a function already changes the fingerprints
+        of the Nodes using it, so this only frees the space used by
+        values which would never be loaded again.
+        """
+
+        if not isinstance(owner, str):
+            owner = _qualified_name(owner)
+        with self._lock, self._db:
+            self._db.execute(
+                    "DELETE FROM node_values WHERE owner = ?", (owner,))
+            self._bytes = self._total_size()
+
+    def clear(self):
+        """Delete every stored value."""
+
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM node_values")
+            self._bytes = 0
+
+
+def _stamp(node):
+    """Return the revisions which a Node's fingerprint depends on."""
+
+    return (node._changed_at, node._verified_at)
+
@@ -0,0 +1,354 @@
+"""Evaluate independent FuncNodes concurrently in worker processes."""
+
+__all__ = ["process_value"]
+
+from concurrent.futures import ProcessPoolExecutor
+import atexit
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+import itertools
+import pickle
+import sys
+import weakref
+
+from .core import *
+from .node import *
+from .node import _compute_value, _unverified
+from .parallel import _Schedule
+
+
+def process_value(node, executor=None, max_workers=None,
+        shared_min_bytes=1 << 16):
+    """Get the value of node, computing invalid FuncNodes whose
+    arguments are valid concurrently in worker processes.
+
+    Only the function of each FuncNode and the values of its arguments
+    are sent to the workers (or to executor, which must be a
+    ProcessPoolExecutor created before any other process pool). The
+    function must be picklable, so FuncNodes of lambdas, and every other
+    kind of Node, are computed in the calling process. A chain of
+    FuncNodes, each the only invalid dependent of the previous one, is
+    sent to a single worker, which returns all of their values at once.
+
+    NumPy arrays and bytes of at least shared_min_bytes are passed
+    through shared memory instead of being pickled. An array computed by
+    a worker becomes the value of its Node without being copied, and is
+    passed to later workers by name; the workers see such arrays as
+    read-only.
+
+    As with parallel_value, the calling process owns the Graph: every
+    state change and event happens there.
+    """
+
+    if not _unverified(node):
+        return node.value
+
+    # Worker processes must report the shared memory they use to the
+    # same tracker as this process.
+    resource_tracker.ensure_running()
+    _shared.sweep()
+    if executor is None:
+        with ProcessPoolExecutor(max_workers) as executor:
+            return _ProcessSchedule(
+                    node, executor, shared_min_bytes).run()
+    else:
+        return _ProcessSchedule(node, executor, shared_min_bytes).run()
+
+
+class _ProcessSchedule(_Schedule):
+    """A _Schedule which sends chains of FuncNodes to worker processes."""
+
+    def __init__(self, root, executor, shared_min_bytes):
+        super().__init__(root, executor)
+        self.shared_min_bytes = shared_min_bytes
+        self.temporary = []
+        self._picklable = {}
+
+        # Map the first Node of each chain to the rest of the chain,
+        # which is computed along with it.
+        self.chains = {}
+        self.chained = set()
+
+    def _claim(self):
+        super()._claim()
+        if self.root._graph.cache is None:
+            self._find_chains()
+
+    def _find_chains(self):
+        last = {}
+        for node in self.dependents:
+            if (node not in self.claimed or not self._can_send(node)
+                    or self.waiting[node] != 1):
+                continue
+            arg = next(a for a in itertools.chain(
+                    node._args, node._kwargs.values())
+                    if a in self.dependents)
+            if (self.dependents[arg] == [node] and arg in self.claimed
+                    and self._can_send(arg)):
+                head = last.pop(arg, arg)
+                self.chains.setdefault(head, []).append(node)
+                self.chained.add(node)
+                last[node] = head
+
+    def _can_send(self, node):
+        """Return whether node can be computed in a worker process."""
+
+        if node.__class__.compute_value is not FuncNode.compute_value:
+            return False
+        func = node._kwargs["__func"].value
+        try:
+            return self._picklable[func]
+        except KeyError:
+            try:
+                pickle.dumps(func)
+                picklable = True
+            except Exception:
+                picklable = False
+            self._picklable[func] = picklable
+            return picklable
+
+    def run(self):
+        try:
+            return super().run()
+        finally:
+            for block in self.temporary:
+                block.close()
+                block.unlink()
+
+    def _start(self, node):
+        if node in self.chained:
+            # Computed along with the first Node of its chain.
+            return
+        if node not in self.claimed:
+            # Computed by another thread.
+            self._finish(node)
+            return
+
+        node.state = Node.State.PENDING
+        if not node._needs_recompute():
+            rest = self.chains.pop(node, None)
+            if rest:
+                # The rest of the chain may still need to be computed.
+                self.chained.discard(rest[0])
+                if rest[1:]:
+                    self.chains[rest[0]] = rest[1:]
+            node.state = Node.State.VALID
+            self._finish(node)
+        elif node._async:
+            raise TypeError("Use avalue() to compute the value "
+                    f"of a {node.__class__.__name__}.")
+        elif not self._can_send(node):
+            node.value = _compute_value(node)
+            self._finish(node)
+        else:
+            cache = node._graph.cache
+            if cache is not None:
+                found, value = cache.load(node)
+                if found:
+                    node.value = value
+                    self._finish(node)
+                    return
+            nodes = [node, *self.chains.get(node, ())]
+            tasks = [self._task(n, nodes[:i]) for i, n in enumerate(nodes)]
+            future = self.executor.submit(
+                    _run_chain, tasks, self.shared_min_bytes)
+            self.running[future] = nodes
+
+    def _task(self, node, previous):
+        """Describe the computation of node in a worker, given the Nodes
+        computed before it in the same worker.
+        """
+
+        def send(arg):
+            if arg in previous:
+                return _Previous(previous.index(arg))
+            return _shared.send(
+                    arg.value, self.shared_min_bytes, self.temporary)
+
+        func = node._kwargs["__func"].value
+        args = [send(arg) for arg in node._args]
+        kwargs = {k: send(arg) for k, arg in node._kwargs.items()
+                if k != "__func"}
+        return func, args, kwargs
+
+    def _complete(self, nodes, values):
+        for node, value in zip(nodes, values):
+            node.value = _shared.receive(value)
+            if node._graph.cache is not None:
+                node._graph.cache.store(node, node.value)
+            self._finish(node)
+
+
+class _SharedArray:
+    """Describe a NumPy array stored in shared memory."""
+
+    def __init__(self, name, shape, dtype):
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+
+
+class _SharedBytes:
+    """Describe bytes (or a bytearray) stored in shared memory."""
+
+    def __init__(self, name, size, cls):
+        self.name = name
+        self.size = size
+        self.cls = cls
+
+
+class _Previous:
+    """Refer to the value of a Node computed earlier in the same chain."""
+
+    def __init__(self, index):
+        self.index = index
+
+
+def _share(value, min_bytes):
+    """Copy value into a new shared memory block, and return the block
+    and a description of the value, or return None if value is not
+    worth sharing.
+    """
+
+    np = sys.modules.get("numpy")
+    if (np is not None and isinstance(value, np.ndarray)
+            and value.nbytes >= max(min_bytes, 1)
+            and not value.dtype.hasobject):
+        block = SharedMemory(create=True, size=value.nbytes)
+        np.ndarray(value.shape, value.dtype, buffer=block.buf)[...] = value
+        return block, _SharedArray(block.name, value.shape, value.dtype)
+    if (isinstance(value, (bytes, bytearray))
+            and len(value) >= max(min_bytes, 1)):
+        block = SharedMemory(create=True, size=len(value))
+        block.buf[:len(value)] = value
+        return block, _SharedBytes(block.name, len(value), value.__class__)
+    return None
+
+
+class _SharedValues:
+    """Track the shared memory blocks holding Node values in the calling
+    process.
+
+    An array computed by a worker is a view of the block the worker
+    stored it in. The block is kept until the array is garbage, so it
+    can be passed to other workers, and is freed by the next sweep().
+    """
+
+    def __init__(self):
+        # Map the id of each shared array to a weak reference to it and
+        # its block.
+        self._arrays = {}
+
+    def send(self, value, min_bytes, temporary):
+        """Return value, or a description of it in shared memory, to
+        send to a worker. Blocks which only exist for the worker are
+        appended to temporary.
+        """
+
+        entry = self._arrays.get(id(value))
+        if entry is not None and entry[0]() is value:
+            block = entry[1]
+            return _SharedArray(block.name, value.shape, value.dtype)
+        shared = _share(value, min_bytes)
+        if shared is None:
+            return value
+        block, description = shared
+        block.close()
+        temporary.append(block)
+        return description
+
+    def receive(self, value):
+        """Return the value described by a worker's result."""
+
+        if isinstance(value, _SharedArray):
+            import numpy as np
+
+            block = SharedMemory(value.name)
+            array = np.ndarray(value.shape, value.dtype, buffer=block.buf)
+            self._arrays[id(array)] = (weakref.ref(array), block)
+            return array
+        if isinstance(value, _SharedBytes):
+            block = SharedMemory(value.name)
+            try:
+                with block.buf[:value.size] as data:
+                    return value.cls(data)
+            finally:
+                block.close()
+                block.unlink()
+        return value
+
+    def sweep(self):
+        """Free the blocks of arrays which are garbage."""
+
+        for key, (ref, block) in list(self._arrays.items()):
+            if ref() is None:
+                del self._arrays[key]
+                block.close()
+                block.unlink()
+
+    def unlink(self):
+        """Free every block once the process exits, when the arrays
+        viewing them can no longer be used.
+        """
+
+        for _, block in self._arrays.values():
+            block.unlink()
+        self._arrays.clear()
+
+
+_shared = _SharedValues()
+atexit.register(_shared.unlink)
+
+
+def _run_chain(tasks, min_bytes):
+    """Compute a chain of FuncNodes in a worker process, and return
+    their values, sharing large ones.
+    """
+
+    blocks = []
+    values = []
+
+    def receive(arg):
+        if isinstance(arg, _Previous):
+            return values[arg.index]
+        if isinstance(arg, _SharedArray):
+            import numpy as np
+
+            block = SharedMemory(arg.name)
+            blocks.append(block)
+            array = np.ndarray(arg.shape, arg.dtype, buffer=block.buf)
+            array.flags.writeable = False
+            return array
+        if isinstance(arg, _SharedBytes):
+            block = SharedMemory(arg.name)
+            try:
+                with block.buf[:arg.size] as data:
+                    return arg.cls(data)
+            finally:
+                block.close()
+        return arg
+
+    try:
+        for func, args, kwargs in tasks:
+            values.append(func(*map(receive, args),
+                    **{k: receive(v) for k, v in kwargs.items()}))
+
+        results = []
+        for value in values:
+            shared = _share(value, min_bytes)
+            if shared is None:
+                results.append(value)
+            else:
+                # The calling process frees the block.
+                block, description = shared
+                block.close()
+                results.append(description)
+        return results
+    finally:
+        values.clear()
+        for block in blocks:
+            try:
+                block.close()
+            except BufferError:
+                # The function kept a reference to its argument.
+                pass
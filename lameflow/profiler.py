@@ -0,0 +1,251 @@
+"""Record how much time is spent computing each Node."""
+
+__all__ = ["Profiler", "NodeStats"]
+
+import csv
+import itertools
+import json
+import os
+import threading
+import time
+
+from .node import *
+
+
+class NodeStats:
+    """Profiling statistics of a Node, or of every Node of a class.
+
+    hits counts the times the value was used without being recomputed:
+    reads of a valid value, and invalid Nodes found to be unaffected by
+    the changes to their arguments. cumulative is the time spent in
+    compute_value, plus, when the value was read with value, the time
+    spent computing the invalid arguments it was recomputed from.
+    exclusive is only the time spent in compute_value, excluding the
+    computations of other Nodes nested in it (for example, Nodes created
+    and read by compute_value). last_cause describes why the Node was
+    last recomputed.
+    """
+
+    __slots__ = (
+        "hits",
+        "recomputes",
+        "invalidations",
+        "cumulative",
+        "exclusive",
+        "last_cause",
+    )
+
+    def __init__(self):
+        self.hits = 0
+        self.recomputes = 0
+        self.invalidations = 0
+        self.cumulative = 0.0
+        self.exclusive = 0.0
+        self.last_cause = None
+
+    def __repr__(self):
+        return (f"{self.__class__.__name__}(hits={self.hits}, "
+                f"recomputes={self.recomputes}, "
+                f"invalidations={self.invalidations}, "
+                f"cumulative={self.cumulative:.6f}, "
+                f"exclusive={self.exclusive:.6f})")
+
+
+class Profiler:
+    """Record statistics about the Nodes of a Graph while it is enabled.
+
+    Statistics are kept for each Node (in nodes) and for each Node class
+    (in classes). A Profiler is enabled with start() and disabled with
+    stop(), or by using it as a context manager. When no Profiler is
+    enabled, the engine only checks that the profiler attribute of the
+    Graph is None.
+
+    The Profiler refers to every Node it has statistics for, so they are
+    not freed until reset() is called or the Profiler is discarded.
+    """
+
+    fields = ["hits", "recomputes", "invalidations",
+            "cumulative", "exclusive", "last_cause"]
+
+    def __init__(self, graph=None):
+        self.graph = Graph.current() if graph is None else graph
+        self.nodes = {}
+        self.classes = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start recording the statistics of the Graph."""
+
+        if self.graph.profiler not in (None, self):
+            raise ValueError("Another Profiler is enabled for the Graph.")
+        self.graph.profiler = self
+
+    def stop(self):
+        """Stop recording the statistics of the Graph."""
+
+        if self.graph.profiler is self:
+            self.graph.profiler = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def reset(self):
+        """Discard every statistic recorded so far."""
+
+        with self._lock:
+            self.nodes.clear()
+            self.classes.clear()
+
+    def _stats(self, node):
+        """Return the statistics of node and of its class."""
+
+        try:
+            return self.nodes[node], self.classes[node.__class__]
+        except KeyError:
+            with self._lock:
+                node_stats = self.nodes.setdefault(node, NodeStats())
+                class_stats = self.classes.setdefault(
+                        node.__class__, NodeStats())
+            return node_stats, class_stats
+
+    def _hit(self, node):
+        for stats in self._stats(node):
+            stats.hits += 1
+
+    def _invalidated(self, nodes):
+        for node in nodes:
+            for stats in self._stats(node):
+                stats.invalidations += 1
+
+    def _begin(self, node, nested=True, entered=None):
+        """Start timing a computation of node, and return a token to
+        pass to _end.
+
+        If nested is true, the computation must end before any other
+        computation started before it on the same thread, and its time
+        is excluded from theirs. If entered is given, it is the
+        time.perf_counter() at which the arguments of node started to
+        be computed, which is included in its cumulative time.
+        """
+
+        cause = self._cause(node)
+        if nested:
+            try:
+                stack = self._local.stack
+            except AttributeError:
+                stack = self._local.stack = []
+            # Time spent in nested computations.
+            stack.append(0.0)
+        start = time.perf_counter()
+        return cause, nested, start, start if entered is None else entered
+
+    def _end(self, node, token):
+        end = time.perf_counter()
+        cause, nested, start, entered = token
+        elapsed = end - start
+        nested_time = 0.0
+        if nested:
+            stack = self._local.stack
+            nested_time = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+        for stats in self._stats(node):
+            stats.recomputes += 1
+            stats.cumulative += end - entered
+            stats.exclusive += elapsed - nested_time
+            stats.last_cause = cause
+
+    def _compute(self, node, func, /, *args, **kwargs):
+        """Return func(*args, **kwargs), timed as a computation of
+        node.
+        """
+
+        token = self._begin(node)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._end(node, token)
+
+    def _cause(self, node):
+        """Describe why node is about to be recomputed."""
+
+        stats = self.nodes.get(node)
+        if stats is None or not stats.recomputes:
+            return "first computation"
+        verified_at = node._verified_at
+        if verified_at >= 0:
+            for name, arg in itertools.chain(
+                    enumerate(node._args), node._kwargs.items()):
+                if arg._changed_at > verified_at:
+                    return (f"argument {name} "
+                            f"({arg.__class__.__name__}) changed")
+        return "invalidated"
+
+    def rows(self, per="node", sort_by="exclusive"):
+        """Return the statistics of every Node (or, if per is "class",
+        every Node class) as dicts, in descending order of sort_by.
+        """
+
+        if per == "node":
+            items = [(str(node), node.__class__, stats)
+                    for node, stats in list(self.nodes.items())]
+        elif per == "class":
+            items = [(cls.__qualname__, cls, stats)
+                    for cls, stats in list(self.classes.items())]
+        else:
+            raise ValueError(f"Expected 'node' or 'class', got {per!r}.")
+
+        rows = []
+        for name, cls, stats in items:
+            row = {"name": name, "class": cls.__qualname__}
+            row.update((field, getattr(stats, field))
+                    for field in self.fields)
+            rows.append(row)
+        rows.sort(key=lambda row: row[sort_by], reverse=True)
+        return rows
+
+    def top(self, n=10, per="node", sort_by="exclusive"):
+        """Return the n rows with the largest values of sort_by."""
+
+        return self.rows(per, sort_by)[:n]
+
+    def to_csv(self, file, per="node"):
+        """Write the rows to a CSV file, given as a path or a text file
+        object.
+        """
+
+        with _open(file) as f:
+            writer = csv.DictWriter(f, ["name", "class", *self.fields])
+            writer.writeheader()
+            writer.writerows(self.rows(per))
+
+    def to_json(self, file, per="node"):
+        """Write the rows to a JSON file, given as a path or a text file
+        object.
+        """
+
+        with _open(file) as f:
+            json.dump(self.rows(per), f, indent=2)
+
+
+class _open:
+    """Open a path for writing, or use an open file without closing it."""
+
+    def __init__(self, file):
+        self.file = file
+        self.opened = None
+
+    def __enter__(self):
+        if isinstance(self.file, (str, os.PathLike)):
+            self.opened = open(self.file, "w", newline="")
+            return self.opened
+        return self.file
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.opened is not None:
+            self.opened.close()
@@ -0,0 +1,168 @@
+"""Evaluate Nodes for many sets of input values at once."""
+
+__all__ = ["evaluate_scenarios"]
+
+import functools
+import itertools
+import numbers
+import operator
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .compiler import _Value, _topological_order
+from .core import *
+from .math import *
+from .node import *
+
+
+# The operators computing the Nodes in lameflow.math, and the number of
+# arguments they take (None for any number).
+_OPERATORS = {
+    AddNode: (operator.add, None),
+    SubNode: (operator.sub, 2),
+    MulNode: (operator.mul, None),
+    DivNode: (operator.truediv, 2),
+    PowNode: (operator.pow, 2),
+}
+
+
+def evaluate_scenarios(outputs, bindings):
+    """Compute outputs (a Node or a list of Nodes) for each of several
+    scenarios, without changing any Node.
+
+    bindings maps input Nodes (usually VarNodes) to sequences of
+    values, one per scenario, which must all have the same length.
+    Return a list with the value of outputs in each scenario (or, if
+    outputs is a list, a tuple of the values of outputs).
+
+    Each Node is evaluated once for all of the scenarios. Nodes which do
+    not depend on the inputs are computed by the Graph as usual. If
+    NumPy is installed, the Nodes in lameflow.math compute the values of
+    all scenarios at once when those values are floats, and fall back to
+    one scenario at a time if NumPy reports an error, so that Python
+    raises the same exceptions as it would for a single scenario. Other
+    Nodes are computed one scenario at a time: FuncNodes call their
+    functions directly, and other Nodes have compute_value called with
+    stand-ins whose value attribute holds the value of each argument.
+    """
+
+    single = isinstance(outputs, Node)
+    outputs = [outputs] if single else list(outputs)
+
+    counts = {len(values) for values in bindings.values()}
+    if len(counts) > 1:
+        raise ValueError("Every input must have the same number of "
+                f"values, got {sorted(counts)}.")
+    count = counts.pop() if counts else 1
+
+    # Map each Node which depends on the inputs to its values in every
+    # scenario, as a list, or as a NumPy array of floats.
+    batches = {node: _batch(values) for node, values in bindings.items()}
+    for node in _topological_order(outputs, bindings):
+        if node in batches:
+            continue
+        args = list(node._args)
+        kwargs = dict(node._kwargs)
+        if not any(arg in batches for arg in itertools.chain(
+                args, kwargs.values())):
+            continue
+
+        if node._async:
+            raise TypeError("Cannot evaluate a "
+                    f"{node.__class__.__name__}, which is asynchronous.")
+        batch = _vectorized(node, args, kwargs, batches)
+        if batch is None:
+            batch = _looped(node, args, kwargs, batches, count)
+        batches[node] = batch
+
+    columns = []
+    for node in outputs:
+        if node in batches:
+            batch = batches[node]
+            columns.append(batch if isinstance(batch, list)
+                    else batch.tolist())
+        else:
+            columns.append([node.value] * count)
+    if single:
+        return columns[0]
+    return list(zip(*columns))
+
+
+def _batch(values):
+    """Return the values of an input in every scenario, as a NumPy array
+    if they are all floats, or as a list.
+    """
+
+    values = list(values)
+    if (np is not None and values
+            and all(type(v) is float for v in values)):
+        return np.array(values)
+    return values
+
+
+def _vectorized(node, args, kwargs, batches):
+    """Return the values of a math Node in every scenario, computed with
+    NumPy, or None if they cannot be.
+    """
+
+    if np is None or node.__class__ not in _OPERATORS or kwargs:
+        return None
+    op, arg_count = _OPERATORS[node.__class__]
+    if not args or arg_count not in (None, len(args)):
+        return None
+
+    values = []
+    for arg in args:
+        if arg in batches:
+            value = batches[arg]
+            if isinstance(value, list):
+                return None
+        else:
+            value = arg.value
+            if (not isinstance(value, numbers.Real)
+                    or isinstance(value, bool)):
+                return None
+        values.append(value)
+
+    try:
+        with np.errstate(all="raise"):
+            return functools.reduce(op, values)
+    except (ArithmeticError, ValueError):
+        # Compute each scenario with Python's semantics instead.
+        return None
+
+
+def _looped(node, args, kwargs, batches, count):
+    """Return the values of a Node in every scenario, computed one
+    scenario at a time.
+    """
+
+    def columns(nodes):
+        for arg in nodes:
+            if arg in batches:
+                batch = batches[arg]
+                yield batch if isinstance(batch, list) else batch.tolist()
+            else:
+                yield itertools.repeat(arg.value, count)
+
+    cls = node.__class__
+    if cls in _OPERATORS and not kwargs:
+        op, arg_count = _OPERATORS[cls]
+        if args and arg_count in (None, len(args)):
+            return [functools.reduce(op, row)
+                    for row in zip(*columns(args))]
+
+    if cls is FuncNode:
+        func = kwargs.pop("__func").value
+        names = list(kwargs)
+        return [func(*row[:len(args)], **dict(zip(names, row[len(args):])))
+                for row in zip(*columns(args), *columns(kwargs.values()))]
+
+    names = list(kwargs)
+    return [node.compute_value(*map(_Value, row[:len(args)]),
+            **{name: _Value(value)
+            for name, value in zip(names, row[len(args):])})
+            for row in zip(*columns(args), *columns(kwargs.values()))]
@@ -0,0 +1,404 @@
+"""Save the Nodes of a Graph to a file, and restore them in a new
+process without recomputing or recreating them one by one.
+
+A snapshot file is laid out so that it can be memory-mapped:
+
+- A header: the magic bytes, then the number of Nodes and of edges.
+- For each Node, the index of its class, then its state (1 if valid).
+- An edge array: the indices of the arguments of every Node, positional
+  arguments first, with an array of offsets marking where the
+  arguments of each Node start.
+- A blob of Node records (key, name, keyword argument names, and the
+  attributes of subclasses), with an array of offsets. The record is
+  empty for Nodes which only need their positional arguments.
+- A blob of the values of valid Nodes, with an array of offsets.
+- A pickled trailer with the classes and the names of the Nodes.
+
+Nodes are numbered so that each Node comes after its arguments, and
+records and values are pickled separately, referring to Nodes by their
+indices, so that a subgraph can be restored by reading only its part of
+the file.
+"""
+
+__all__ = ["save_snapshot", "load_snapshot"]
+
+import array
+import contextvars
+import io
+import itertools
+import mmap
+import pickle
+import struct
+import sys
+import weakref
+
+from .core import *
+from .node import *
+from .node import _NO_KWARGS, _unverified
+
+
+_MAGIC = b"LFSNAP1" + (b"<" if sys.byteorder == "little" else b">")
+_HEADER = struct.Struct("=8sQQ")
+
+# Slots which are saved and restored by the snapshot format itself.
+_NODE_SLOTS = frozenset(Node.__slots__)
+
+
+def save_snapshot(file, graph=None, roots=None):
+    """Write the Nodes of graph (by default, the current Graph) to the
+    file at the given path: every memoized Node, or if roots is given,
+    the Nodes in roots and every Node they depend on.
+
+    Keys, arguments, states, and the values of valid Nodes are saved.
+    Keys and values are pickled; a Node whose value cannot be pickled is
+    saved as invalid, so it is recomputed after being restored, as is a
+    Node which may be outdated in a lazily invalidated Graph.
+    """
+
+    graph = Graph.current() if graph is None else graph
+    if roots is None:
+        roots = []
+        for key in graph.memo:
+            try:
+                roots.append(graph.memo[key])
+            except KeyError:
+                # A weak memo may lose Nodes while it is iterated.
+                continue
+    order = _topological_order(roots)
+    index = {node: i for i, node in enumerate(order)}
+
+    classes = []
+    class_index = {}
+    class_ids = array.array("q")
+    states = bytearray()
+    edge_offsets = array.array("q", [0])
+    edges = array.array("q")
+    records = _Blob(index)
+    values = _Blob(index)
+
+    for node in order:
+        cls = node.__class__
+        if cls not in class_index:
+            class_index[cls] = len(classes)
+            classes.append(cls)
+        class_ids.append(class_index[cls])
+
+        edges.extend(index[arg] for arg in node._args)
+        edges.extend(index[arg] for arg in node._kwargs.values())
+        edge_offsets.append(len(edges))
+
+        extra = _extra_attributes(node)
+        if (node.name is None and not node._kwargs and not extra
+                and node._key == Node.key(cls, *node._args)):
+            # Most Nodes only need their arguments to be restored.
+            records.add_empty()
+        else:
+            # VarNodes are given new keys when they are restored.
+            key = None if isinstance(node, VarNode) else node._key
+            records.add((key, node.name, tuple(node._kwargs), extra))
+
+        valid = not _unverified(node)
+        if valid and not values.add(node._value, strict=False):
+            if isinstance(node, IndependentNode):
+                raise TypeError(f"Cannot pickle the value of '{node}'.")
+            valid = False
+            values.add(None)
+        elif not valid:
+            values.add(None)
+        states.append(valid)
+
+    states.extend(bytes(-len(states) % 8))
+    trailer = pickle.dumps({
+        "classes": classes,
+        "names": [node.name for node in order],
+    })
+
+    with open(file, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, len(order), len(edges)))
+        for section in (class_ids, states, edge_offsets, edges,
+                records.offsets, values.offsets):
+            f.write(section)
+        f.write(records.data.getbuffer())
+        f.write(values.data.getbuffer())
+        f.write(trailer)
+
+
+def load_snapshot(file, graph=None, roots=None):
+    """Restore the Nodes saved by save_snapshot into graph (by default,
+    the current Graph), and return them, each after its arguments.
+
+    If roots is given, only the Nodes with those names, and the Nodes
+    they depend on, are restored. A saved Node whose key is already
+    memoized in graph is replaced by the memoized Node. Restored Nodes
+    are memoized, but no events are fired for them.
+    """
+
+    graph = Graph.current() if graph is None else graph
+    with open(file, "rb") as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data, \
+            memoryview(data) as view:
+        return _Loader(view, graph).load(roots)
+
+
+class _Blob:
+    """Pickled objects stored back to back, with their offsets, where
+    Nodes are pickled as their indices.
+    """
+
+    def __init__(self, index):
+        self.data = io.BytesIO()
+        self.offsets = array.array("q", [0])
+        self._pickler = _Pickler(self.data, index)
+
+    def add(self, obj, strict=True):
+        """Append obj, and return True. If strict is false, return False
+        instead of raising an exception if obj cannot be pickled.
+        """
+
+        start = self.data.tell()
+        try:
+            self._pickler.dump(obj)
+        except Exception:
+            if strict:
+                raise
+            self.data.seek(start)
+            self.data.truncate()
+            return False
+        finally:
+            # Each object is unpickled on its own.
+            self._pickler.clear_memo()
+        self.offsets.append(self.data.tell())
+        return True
+
+    def add_empty(self):
+        """Append an empty record."""
+
+        self.offsets.append(self.data.tell())
+
+
+class _Pickler(pickle.Pickler):
+    """Pickle Nodes as references to their indices in the snapshot."""
+
+    def __init__(self, file, index):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self._index = index
+
+    def reducer_override(self, obj):
+        if isinstance(obj, Node):
+            try:
+                return _node, (self._index[obj],)
+            except KeyError:
+                raise ValueError(f"'{obj}' is not in the snapshot.") \
+                        from None
+        return NotImplemented
+
+
+# The Nodes being restored by load_snapshot, by index.
+_restoring = contextvars.ContextVar("lameflow_snapshot_nodes")
+
+
+def _node(i):
+    """Return Node i of the snapshot being restored."""
+
+    try:
+        return _restoring.get()[i]
+    except (LookupError, KeyError):
+        raise ValueError(f"Node {i} of the snapshot is not restored.") \
+                from None
+
+
+class _Loader:
+    """Restore Nodes from the memory of a snapshot file."""
+
+    def __init__(self, view, graph):
+        magic, count, edge_count = _HEADER.unpack_from(view)
+        if magic != _MAGIC:
+            raise ValueError("Not a snapshot file, or one saved on a "
+                    "machine with a different byte order.")
+        self.graph = graph
+        self.count = count
+        self._views = []
+
+        position = _HEADER.size
+        self.class_ids, position = self._array(view, position, count)
+        self.states = view[position:position + count]
+        self._views.append(self.states)
+        position += count + -count % 8
+        self.edge_offsets, position = self._array(view, position, count + 1)
+        self.edges, position = self._array(view, position, edge_count)
+        self.record_offsets, position = self._array(
+                view, position, count + 1)
+        self.value_offsets, position = self._array(
+                view, position, count + 1)
+        self.records = view[position:position + self.record_offsets[-1]]
+        position += self.record_offsets[-1]
+        self.values = view[position:position + self.value_offsets[-1]]
+        position += self.value_offsets[-1]
+        self._views += [self.records, self.values]
+
+        trailer = pickle.loads(view[position:])
+        self.classes = trailer["classes"]
+        self.names = trailer["names"]
+        self.nodes = {}
+
+    def _array(self, view, position, length):
+        end = position + 8 * length
+        array_view = view[position:end].cast("q")
+        self._views.append(array_view)
+        return array_view, end
+
+    def load(self, roots):
+        token = _restoring.set(self.nodes)
+        try:
+            return self._load(roots)
+        finally:
+            _restoring.reset(token)
+            # The memory map cannot be closed while views of it exist.
+            for view in self._views:
+                view.release()
+
+    def _load(self, roots):
+        selected = self._select(roots)
+        graph = self.graph
+        memo = graph.memo
+        revision = graph._revision = next(graph._revisions)
+
+        # Create every Node first, so that records can refer to Nodes
+        # which come after them.
+        for i in selected:
+            self.nodes[i] = object.__new__(self.classes[self.class_ids[i]])
+
+        restored = []
+        for i in selected:
+            node = self.nodes[i]
+            args = [self.nodes[j] for j in self.edges[
+                    self.edge_offsets[i]:self.edge_offsets[i + 1]]]
+            if self.record_offsets[i] == self.record_offsets[i + 1]:
+                key = Node.key(node.__class__, *args)
+                name, kwarg_names, extra = None, (), {}
+            else:
+                key, name, kwarg_names, extra = self._unpickle(
+                        self.records, self.record_offsets, i)
+
+            if isinstance(node, VarNode):
+                key = (node.__class__, next(graph._instance_counter))
+            else:
+                existing = memo.get(key)
+                if existing is not None:
+                    self.nodes[i] = existing
+                    continue
+
+            positional = len(args) - len(kwarg_names)
+
+            node._key = key
+            node.name = name
+            node._graph = graph
+            node._initialized = True
+            node._state = Node.State.INVALID
+            node._value = None
+            node._changed_at = 0
+            node._verified_at = -1
+            node._inflight = None
+            node._args = tuple(args[:positional])
+            node._kwargs = (dict(zip(kwarg_names, args[positional:]))
+                    if kwarg_names else _NO_KWARGS)
+            node._dependents = ()
+            for attribute, value in extra.items():
+                setattr(node, attribute, value)
+
+            if node._async:
+                graph._has_async = True
+            memo[key] = node
+            restored.append(i)
+
+        for i in restored:
+            node = self.nodes[i]
+            if self.states[i]:
+                node._value = self._unpickle(
+                        self.values, self.value_offsets, i)
+                node._state = Node.State.VALID
+                node._changed_at = node._verified_at = revision
+            for arg in itertools.chain(node._args, node._kwargs.values()):
+                if arg._dependents:
+                    arg._dependents.add(node)
+                elif memo.weak_dependents:
+                    arg._dependents = weakref.WeakSet((node,))
+                else:
+                    arg._dependents = {node}
+
+        return [self.nodes[i] for i in selected]
+
+    def _select(self, roots):
+        """Return the indices of the Nodes to restore, in order."""
+
+        if roots is None:
+            return range(self.count)
+
+        roots = set(roots)
+        stack = [i for i, name in enumerate(self.names) if name in roots]
+        missing = roots.difference(self.names[i] for i in stack)
+        if missing:
+            raise KeyError(f"No Nodes named {sorted(missing)!r} in the "
+                    "snapshot.")
+
+        selected = set()
+        while stack:
+            i = stack.pop()
+            if i not in selected:
+                selected.add(i)
+                stack.extend(self.edges[
+                        self.edge_offsets[i]:self.edge_offsets[i + 1]])
+        return sorted(selected)
+
+    def _unpickle(self, blob, offsets, i):
+        with blob[offsets[i]:offsets[i + 1]] as data:
+            return pickle.loads(data)
+
+
+def _topological_order(roots):
+    """Return roots and every Node they depend on, each after its
+    arguments.
+    """
+
+    order = []
+    visited = set()
+    for root in roots:
+        if root in visited:
+            continue
+        visited.add(root)
+        frames = [(root, itertools.chain(root._args, root._kwargs.values()))]
+        while frames:
+            node, remaining_args = frames[-1]
+            for arg in remaining_args:
+                if arg not in visited:
+                    visited.add(arg)
+                    args = itertools.chain(arg._args, arg._kwargs.values())
+                    frames.append((arg, args))
+                    break
+            else:
+                frames.pop()
+                order.append(node)
+    return order
+
+
+def _extra_attributes(node):
+    """Return the attributes of node which are not Node slots, such as
+    the slots of its subclasses and its __dict__.
+    """
+
+    extra = {}
+    for cls in node.__class__.__mro__:
+        slots = cls.__dict__.get("__slots__", ())
+        if isinstance(slots, str):
+            slots = (slots,)
+        for slot in slots:
+            if slot in _NODE_SLOTS or slot in ("__dict__", "__weakref__"):
+                continue
+            if slot.startswith("__") and not slot.endswith("__"):
+                slot = f"_{cls.__name__.lstrip('_')}{slot}"
+            try:
+                extra[slot] = getattr(node, slot)
+            except AttributeError:
+                pass
+    extra.update(getattr(node, "__dict__", {}))
+    return extra
@@ -0,0 +1,11 @@
+import pytest
+
+from lameflow import Graph
+
+
+@pytest.fixture(autouse=True)
+def graph():
+    """Run each test in a new current Graph."""
+
+    with Graph() as graph:
+        yield graph
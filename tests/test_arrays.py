@@ -0,0 +1,56 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from lameflow import VarNode
+from lameflow.arrays import ArrayAddNode, ArrayMulNode
+
+
+@pytest.mark.parametrize("cls", [ArrayAddNode, ArrayMulNode])
+def test_single_argument(cls):
+    x = VarNode(np.arange(3.0))
+    assert np.array_equal(cls(x).value, [0.0, 1.0, 2.0])
+    assert cls(VarNode(2.0)).value == 2.0
+
+
+def test_held_values_are_not_overwritten():
+    x = VarNode(np.arange(3.0))
+    y = ArrayAddNode(x, x)
+    held = [y.value, y.value[1:]]
+    for i in range(4):
+        x.value = np.full(3, float(i))
+        held.append(y.value)
+    assert np.array_equal(held[0], [0.0, 2.0, 4.0])
+    assert np.array_equal(held[1], [2.0, 4.0])
+    for i in range(4):
+        assert np.array_equal(held[2 + i], [2.0 * i] * 3)
+
+
+def test_free_buffers_are_reused():
+    x = VarNode(np.arange(3.0))
+    y = ArrayAddNode(x, x)
+    buffers = set()
+    for i in range(4):
+        x.value = np.full(3, float(i))
+        assert np.array_equal(y.value, [2.0 * i] * 3)
+        buffers.update(id(buffer) for buffer, ref in y._buffers)
+    assert len(buffers) == 2
+
+
+def test_object_arrays():
+    x = VarNode(np.array([1, "a"], dtype=object))
+    y = ArrayAddNode(x, x)
+    assert list(y.value) == [2, "aa"]
+    x.value = np.array([2, "b"], dtype=object)
+    assert list(y.value) == [4, "bb"]
+
+
+def test_arrays_differ_from_other_types_shapes_and_dtypes():
+    x = VarNode(5)
+    x.value = np.array([5])
+    assert isinstance(x.value, np.ndarray)
+    for new in [np.array([[5]]), np.array([5.0]), np.array([5, 5])]:
+        x.value = new
+        assert x.value is new
+    x.value = np.array([5, 5])
+    assert x.value is new
@@ -0,0 +1,63 @@
+import pytest
+
+from lameflow import (
+        AddNode, Batch, ConstNode, Graph, SingleAssignNode, VarNode)
+from lameflow import nodeclass
+
+
+@nodeclass
+class Once(SingleAssignNode):
+    __slots__ = ()
+
+    def compute_value(self, x):
+        return x.value
+
+
+def test_batch_invalidates_dependents_once():
+    x = VarNode(1)
+    y = VarNode(2)
+    total = AddNode(x, y)
+    assert total.value == 3
+    with Batch():
+        x.value = 10
+        y.value = 20
+        assert total.value == 3
+    assert total.value == 30
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_failed_write_in_batch_leaves_graph_consistent(lazy):
+    with Graph(lazy=lazy):
+        x = VarNode(1)
+        y = VarNode(2)
+        once = Once(x)
+        total = AddNode(y, ConstNode(0))
+        assert once.value == 1
+        assert total.value == 2
+
+        with pytest.raises(TypeError):
+            with Batch():
+                y.value = 10
+                x.value = 5
+        assert x.value == 1
+        assert once.value == 1
+        assert total.value == 10
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_single_assign_nodes_are_not_recomputed(lazy):
+    with Graph(lazy=lazy):
+        x = VarNode(1)
+        once = Once(AddNode(x, ConstNode(0)))
+        assert once.value == 1
+        with pytest.raises(TypeError, match="Cannot invalidate"):
+            x.value = 5
+            once.value
+        if lazy:
+            # The change is only found when the Node is read, so it
+            # cannot be rejected and the Node stays unreadable.
+            with pytest.raises(TypeError, match="Cannot invalidate"):
+                once.value
+        else:
+            assert x.value == 1
+            assert once.value == 1
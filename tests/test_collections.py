@@ -0,0 +1,64 @@
+import pytest
+
+from lameflow._collections import ObservableDict, ObservableList
+
+
+def _observed(collection):
+    mutations = []
+    collection.listeners.add(mutations.append)
+    return mutations
+
+
+def test_list_bulk_mutations_notify_once():
+    obs_list = ObservableList(range(6))
+    mutations = _observed(obs_list)
+
+    obs_list.extend([6, 7])
+    obs_list[::2] = ["a", "b", "c", "d"]
+    del obs_list[1::3]
+    assert list(obs_list) == ["a", "b", 3, 5, "d"]
+    assert [(m.index, m.removed, m.added) for m in mutations] == [
+        (6, [], [6, 7]),
+        (0, [0, 1, 2, 3, 4, 5, 6], ["a", 1, "b", 3, "c", 5, "d"]),
+        (1, [1, "b", 3, "c", 5, "d", 7], ["b", 3, 5, "d"]),
+    ]
+
+
+@pytest.mark.parametrize("key", [
+        slice(-3, None), slice(10, 20), slice(None, None, -2),
+        slice(-10, None, 3)])
+def test_list_slices_match_list(key):
+    values = list(range(6))
+    obs_list = ObservableList(values)
+    mutations = _observed(obs_list)
+    expected = list(values)
+    del expected[key]
+    del obs_list[key]
+    assert list(obs_list) == expected
+    for m in mutations:
+        assert values[m.index : m.index + len(m.removed)] == m.removed
+        assert expected[m.index : m.index + len(m.added)] == m.added
+
+
+def test_list_replace_reports_the_changed_span():
+    obs_list = ObservableList("abcdef")
+    mutations = _observed(obs_list)
+    obs_list.replace("abXYef")
+    obs_list.replace("abXYef")
+    assert [(m.index, m.removed, m.added) for m in mutations] == [
+        (2, ["c", "d"], ["X", "Y"])]
+
+
+def test_dict_bulk_mutations_notify_once():
+    obs_dict = ObservableDict(a=1, b=2, c=3)
+    mutations = _observed(obs_dict)
+
+    obs_dict.update(a=1, b=20, d=4)
+    obs_dict.replace({"b": 20, "d": 4, "e": 5})
+    obs_dict.clear()
+    assert obs_dict == {}
+    assert [(m.removed, m.added) for m in mutations] == [
+        ({"b": 2}, {"b": 20, "d": 4}),
+        ({"a": 1, "c": 3}, {"e": 5}),
+        ({"b": 20, "d": 4, "e": 5}, {}),
+    ]
@@ -0,0 +1,81 @@
+from lameflow import (
+        AddNode, ConstNode, DivNode, FuncNode, MulNode, PowNode, SubNode,
+        VarNode, compile_graph)
+
+
+def test_math_nodes_are_inlined():
+    x, y = VarNode(1.0), VarNode(2.0)
+    node = DivNode(SubNode(AddNode(x, y, x), MulNode(x, y)),
+            PowNode(y, ConstNode(2.0)))
+    compiled = compile_graph(node)
+    assert compiled.inputs == [x, y]
+    assert compiled(3.0, 4.0) == (10.0 - 12.0) / 16.0
+    assert "compute_value" not in compiled.source
+    for operator in [" + ", " - ", " * ", " / ", " ** "]:
+        assert operator in compiled.source
+    assert (x.value, y.value) == (1.0, 2.0)
+
+
+def offset(x, k, **extra):
+    return x + k + extra.get("not an identifier", 0)
+
+
+def test_func_node_keyword_arguments():
+    x = VarNode(1)
+    node = FuncNode(offset, x, k=ConstNode(10),
+            **{"not an identifier": ConstNode(100)})
+    compiled = compile_graph(node)
+    assert compiled(2) == 112
+    assert "k=" in compiled.source
+    assert node.value == 111
+
+
+def test_independent_nodes_are_read_from_the_graph():
+    calls = []
+
+    def expensive(v):
+        calls.append(v)
+        return v * 10
+
+    x, y = VarNode(1), VarNode(2)
+    constant = FuncNode(expensive, y)
+    compiled = compile_graph(AddNode(x, constant), inputs=[x])
+    assert [compiled(i) for i in range(3)] == [20, 21, 22]
+    assert calls == [2]
+    y.value = 3
+    assert compiled(0) == 30
+    assert calls == [2, 3]
+
+
+def test_structure_changes_are_recompiled():
+    x = VarNode(1)
+    total = AddNode(x, ConstNode(1))
+    compiled = compile_graph(total)
+    assert compiled(5) == 6
+    source = compiled.source
+    total.args = [x, x, ConstNode(2)]
+    assert compiled(5) == 12
+    assert compiled.source != source
+    assert compiled._compiled
+
+
+def test_names_cannot_break_the_source():
+    x = VarNode(1)
+    node = AddNode(x, x, __name="total\nraise SystemExit")
+    compiled = compile_graph(node)
+    assert compiled(2) == 4
+    assert "raise SystemExit" not in compiled.source.splitlines()
+
+
+def test_fallback_leaves_inputs_unchanged():
+    x, y = VarNode(1.0), VarNode(2.0)
+    total = AddNode(x, y)
+    product = MulNode(total, ConstNode(3.0))
+    compiled = compile_graph([total, product], inputs=[x, y], fallback=True)
+    assert compiled(2.0, 3.0) == (5.0, 15.0)
+
+    total.args = [x, y, ConstNode(1.0)]
+    assert compiled(2.0, 3.0) == (6.0, 18.0)
+    assert not compiled._compiled
+    assert (x.value, y.value) == (1.0, 2.0)
+    assert product.value == 12.0
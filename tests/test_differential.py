@@ -0,0 +1,80 @@
+import asyncio
+import random
+
+import pytest
+
+from lameflow import Batch, FuncNode, Graph, VarNode, parallel_value
+
+
+def combine(a, b):
+    return (a * 3 + b) % 7
+
+
+def build(rnd):
+    """Return random inputs, and random Nodes depending on them."""
+
+    inputs = [VarNode(rnd.randint(0, 5)) for _ in range(8)]
+    nodes = list(inputs)
+    for i in range(150):
+        a, b = rnd.sample(nodes[-30:], 2)
+        nodes.append(FuncNode(combine, a, b, __name=f"n{i}"))
+    return inputs, nodes
+
+
+def expected(node):
+    """Compute the value of node from scratch."""
+
+    if isinstance(node, VarNode):
+        return node.value
+    values = {}
+    stack = [node]
+    while stack:
+        top = stack[-1]
+        if isinstance(top, VarNode):
+            values[top] = top.value
+            stack.pop()
+            continue
+        missing = [a for a in top.args if a not in values]
+        if missing:
+            stack.extend(missing)
+        else:
+            values[top] = combine(*(values[a] for a in top.args))
+            stack.pop()
+    return values[node]
+
+
+def read(node, mode):
+    if mode == "parallel":
+        return parallel_value(node, max_workers=2)
+    if mode == "async":
+        return asyncio.run(node.avalue())
+    return node.value
+
+
+def run(lazy, seed, mode):
+    rnd = random.Random(seed)
+    values = []
+    with Graph(lazy=lazy):
+        inputs, nodes = build(rnd)
+        for _ in range(200):
+            r = rnd.random()
+            if r < 0.5:
+                rnd.choice(inputs).value = rnd.randint(0, 5)
+            elif r < 0.55:
+                with Batch():
+                    for _ in range(3):
+                        rnd.choice(inputs).value = rnd.randint(0, 5)
+            elif r < 0.6:
+                rnd.choice(nodes[len(inputs):]).invalidate()
+            else:
+                node = rnd.choice(nodes)
+                value = read(node, mode)
+                assert value == expected(node)
+                values.append(value)
+    return values
+
+
+@pytest.mark.parametrize("mode", ["value", "parallel", "async"])
+@pytest.mark.parametrize("seed", range(3))
+def test_eager_and_lazy_graphs_agree(seed, mode):
+    assert run(False, seed, mode) == run(True, seed, mode)
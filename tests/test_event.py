@@ -0,0 +1,43 @@
+from lameflow import (
+        AddNode, NodeCreateEvent, NodeEvent, NodeStateEvent, VarNode)
+
+
+def test_listeners_receive_only_their_events():
+    events = []
+    NodeCreateEvent.listeners.add(events.append)
+    try:
+        x = VarNode(1)
+        total = AddNode(x, x)
+        total.value
+        x.value = 2
+    finally:
+        NodeCreateEvent.listeners.discard(events.append)
+    assert [type(e) for e in events] == [NodeCreateEvent] * 2
+    assert [e.node for e in events] == [x, total]
+
+
+def test_graph_listeners_receive_subclass_events(graph):
+    events = []
+    graph.listeners[NodeEvent].add(events.append)
+    x = VarNode(1)
+    total = AddNode(x, x)
+    total.value
+    assert any(isinstance(e, NodeCreateEvent) for e in events)
+    assert any(isinstance(e, NodeStateEvent) for e in events)
+
+
+def test_no_events_are_created_without_listeners(monkeypatch):
+    created = []
+    init = NodeEvent.__init__
+
+    def counting_init(self, *args, **kwargs):
+        created.append(self)
+        init(self, *args, **kwargs)
+
+    monkeypatch.setattr(NodeEvent, "__init__", counting_init)
+    x = VarNode(1)
+    total = AddNode(x, x)
+    total.value
+    x.value = 2
+    total.value
+    assert created == []
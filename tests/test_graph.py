@@ -0,0 +1,118 @@
+import asyncio
+import threading
+
+import pytest
+
+from lameflow import AddNode, ConstNode, Graph, MulNode, Node, VarNode
+
+
+def test_graphs_are_independent():
+    with Graph() as first:
+        x = VarNode(1)
+        with Graph() as second:
+            y = VarNode(1)
+            assert Graph.current() is second
+        assert Graph.current() is first
+    assert x._graph is first
+    assert y._graph is second
+
+
+def test_threads_enter_a_shared_graph():
+    shared = Graph()
+    barrier = threading.Barrier(4)
+    errors = []
+
+    def run():
+        try:
+            for _ in range(200):
+                with shared:
+                    barrier.wait()
+                    assert Graph.current() is shared
+                    AddNode(VarNode(1), VarNode(2)).value
+        except BaseException as e:
+            errors.append(e)
+            barrier.abort()
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+
+
+def test_tasks_enter_a_shared_graph():
+    shared = Graph()
+
+    async def run():
+        for _ in range(10):
+            with shared:
+                await asyncio.sleep(0)
+                assert Graph.current() is shared
+
+    async def main():
+        await asyncio.gather(*(run() for _ in range(5)))
+
+    outer = Graph.current()
+    asyncio.run(main())
+    assert Graph.current() is outer
+
+
+def test_single_thread_evaluation_creates_no_events(graph, monkeypatch):
+    def fail():
+        raise AssertionError("An Event was created.")
+
+    monkeypatch.setattr(threading, "Event", fail)
+    x = VarNode(1)
+    total = AddNode(AddNode(x, x), x)
+    assert total.value == 3
+    x.value = 2
+    assert total.value == 6
+    assert not graph._computing
+
+
+def test_collect_removes_unpinned_nodes(graph):
+    x = VarNode(1)
+    kept = AddNode(x, x)
+    graph.pin(kept)
+    removed = [MulNode(kept, ConstNode(i)) for i in range(3)]
+    for node in removed:
+        node.value
+    observed = MulNode(x, x)
+    observed.observe(lambda value: None)
+
+    assert graph.collect() == 6
+    assert len(kept._dependents) == 0
+    assert MulNode(x, x) is observed
+    assert MulNode(kept, ConstNode(0)) is not removed[0]
+    x.value = 2
+    assert kept.value == 4
+
+
+def test_collected_nodes_cannot_be_used(graph):
+    x = VarNode(2)
+    d = MulNode(x, ConstNode(10))
+    graph.pin(d)
+    assert d.value == 20
+    graph.unpin(d)
+    graph.collect()
+    assert d.state is Node.State.COLLECTED
+    with pytest.raises(ValueError, match="collect"):
+        d.value
+    with pytest.raises(ValueError, match="collect"):
+        x.value = 5
+    with pytest.raises(ValueError, match="collect"):
+        AddNode(d, d)
+    with pytest.raises(ValueError, match="collect"):
+        asyncio.run(d.avalue())
+
+
+def test_pins_are_counted(graph):
+    x = VarNode(1)
+    graph.pin(x, x)
+    graph.unpin(x)
+    assert graph.collect() == 0
+    graph.unpin(x)
+    assert graph.collect() == 1
+    with pytest.raises(ValueError, match="not pinned"):
+        graph.unpin(x)
@@ -0,0 +1,82 @@
+from lameflow import FuncNode, Graph, VarNode
+from lameflow.graphviz import DotExporter, dot_source
+
+
+def test_dot_source_shows_values():
+    x = VarNode(3)
+    node = FuncNode(lambda v: v * 2, x, __name="double")
+    node.value
+    source = dot_source()
+    assert "double" in source
+    assert "<!>6" in source
+
+
+def test_lazy_graph_is_rendered_without_computing():
+    calls = []
+
+    def f(v):
+        calls.append(v)
+        return v
+
+    with Graph(lazy=True):
+        x = VarNode(1)
+        node = FuncNode(f, x)
+        node.value
+        with DotExporter() as exporter:
+            x.value = 5
+            source = dot_source()
+            exported = exporter.source()
+        assert calls == [1]
+        assert "UNVERIFIED" in source
+        assert "UNVERIFIED" in exported
+        assert node.value == 5
+        assert "UNVERIFIED" not in dot_source()
+
+
+def _defined(dot, *nodes):
+    """Return which of nodes have a definition in dot."""
+
+    return [node for node in nodes if f"\n{id(node)} [" in f"\n{dot}"]
+
+
+def test_delta_returns_only_changed_nodes():
+    x = VarNode(2)
+    y = VarNode(3)
+    inner = FuncNode(lambda a, b: a + b, x, y)
+    outer = FuncNode(lambda a, b: a * b, inner, x)
+    assert outer.value == 10
+    with DotExporter() as exporter:
+        assert _defined(exporter.delta(), x, y, inner, outer) == [
+                x, y, inner, outer]
+        assert exporter.delta() == ""
+
+        x.value = 4
+        delta = exporter.delta()
+        assert _defined(delta, x, y, inner, outer) == [x, inner, outer]
+        assert "INVALID" in delta
+        assert exporter.delta() == ""
+
+        assert outer.value == 28
+        delta = exporter.delta()
+        assert _defined(delta, x, y, inner, outer) == [inner, outer]
+        assert "<!>28" in delta
+    x.value = 5
+    assert exporter.delta() == ""
+
+
+def test_source_around_includes_only_neighbors():
+    x = VarNode(2)
+    y = VarNode(3)
+    inner = FuncNode(lambda a, b: a + b, x, y)
+    outer = FuncNode(lambda a, b: a * b, inner, x)
+    outer.value
+    with DotExporter() as exporter:
+        source = exporter.source(around=y, radius=1)
+        assert _defined(source, x, y, inner, outer) == [y, inner]
+        assert f"{id(y)}:" in source
+        assert f"{id(x)}:" not in source
+
+        source = exporter.source(around=y, radius=2)
+        assert _defined(source, x, y, inner, outer) == [x, y, inner, outer]
+        assert _defined(exporter.source(), x, y, inner, outer) == [
+                x, y, inner, outer]
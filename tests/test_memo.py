@@ -0,0 +1,89 @@
+import gc
+import operator
+
+import pytest
+
+from lameflow import (
+        AddNode, ConstNode, FuncNode, Graph, LRUMemo, Node, UnboundedMemo,
+        VarNode, WeakMemo, nodeclass)
+
+
+def test_unbounded_memo_returns_existing_nodes():
+    x = VarNode(1)
+    assert AddNode(x, x) is AddNode(x, x)
+
+
+@pytest.mark.parametrize("memo", [WeakMemo, lambda: LRUMemo(max_size=100)])
+def test_shared_argument_does_not_keep_dependents_alive(memo):
+    with Graph(memo=memo()) as graph:
+        rate = VarNode(2)
+        for i in range(1000):
+            assert FuncNode(operator.mul, VarNode(i), rate).value == 2 * i
+        gc.collect()
+        assert len(graph.memo) <= 110
+        assert graph.memo.evictions >= 1890
+
+        kept = FuncNode(operator.add, VarNode(1), rate)
+        assert kept.value == 3
+        rate.value = 5
+        assert kept.value == 6
+
+
+def test_lru_memo_counts_only_freed_nodes():
+    with Graph(memo=LRUMemo(max_size=1)) as graph:
+        x = VarNode(1)
+        y = VarNode(2)
+        total = AddNode(x, y)
+        # Only the most recently used Node is kept by the memo.
+        z = VarNode(3)
+        gc.collect()
+        assert graph.memo.evictions == 0
+        del total
+        gc.collect()
+        assert graph.memo.evictions == 1
+
+
+def test_set_memo_switches_dependents():
+    with Graph() as graph:
+        x = VarNode(1)
+        total = AddNode(x, x)
+        assert isinstance(x._dependents, set)
+        graph.set_memo(WeakMemo())
+        assert not isinstance(x._dependents, set)
+        graph.set_memo(UnboundedMemo())
+        assert isinstance(x._dependents, set)
+        assert set(x._dependents) == {total}
+
+
+def test_memo_hits_skip_init(graph):
+    calls = []
+
+    @nodeclass
+    class Counted(Node):
+        __slots__ = ()
+
+        def __init__(self, *args, **kwargs):
+            calls.append(args)
+            super().__init__(*args, **kwargs)
+
+    x = VarNode(1)
+    first = Counted(x, scale=ConstNode(2))
+    hits = graph.memo.hits
+    assert Counted(x, scale=ConstNode(2)) is first
+    assert calls == [(x,)]
+    assert graph.memo.hits == hits + 2
+
+
+def test_custom_keys_are_used():
+    @nodeclass
+    class ByName(Node):
+        __slots__ = ()
+
+        @staticmethod
+        def key(cls, *args, **kwargs):
+            return (cls, kwargs.get("label"))
+
+    a = ConstNode("a")
+    assert ByName(label=a) is ByName(label=a)
+    assert ByName(label=a) is not ByName(label=ConstNode("b"))
+    assert VarNode(1) is not VarNode(1)
@@ -0,0 +1,152 @@
+import sys
+
+import pytest
+
+from lameflow import (
+        AddNode, DependencyCycleError, FuncNode, Graph, Node,
+        NodeArgAddEvent, NodeArgRemoveEvent, NodeCallStackPushEvent,
+        NodeStateEvent, VarNode)
+
+
+def test_deep_chain_does_not_recurse(graph):
+    x = VarNode(1)
+    node = x
+    for _ in range(sys.getrecursionlimit() * 5):
+        node = AddNode(node, x)
+    assert node.value == sys.getrecursionlimit() * 5 + 1
+    x.value = 2
+    assert node.value == 2 * (sys.getrecursionlimit() * 5 + 1)
+    assert not graph.call_stack.stack
+
+
+def test_arguments_are_computed_in_order(graph):
+    pushed = []
+    graph.listeners[NodeCallStackPushEvent].add(
+            lambda event: pushed.append(event.node))
+    x = VarNode(1)
+    left = AddNode(x, x)
+    right = AddNode(x, x, x)
+    total = AddNode(left, right)
+    assert total.value == 5
+    assert pushed[-3:] == [total, left, right]
+
+
+def test_dependency_cycle_is_detected(graph):
+    x = VarNode(1)
+    a = AddNode(x, x)
+    b = AddNode(a, x)
+    a.args = [b, x]
+    with pytest.raises(DependencyCycleError):
+        b.value
+    assert not graph.call_stack.stack
+    a.args = [x, x]
+    assert b.value == 3
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_unchanged_value_stops_recomputation(lazy):
+    calls = []
+
+    def parity(v):
+        return v % 2
+
+    def record(v):
+        calls.append(v)
+        return v
+
+    with Graph(lazy=lazy):
+        x = VarNode(1)
+        result = FuncNode(record, FuncNode(parity, x))
+        assert result.value == 1
+        x.value = 3
+        assert result.value == 1
+        assert calls == [1]
+        x.value = 4
+        assert result.value == 0
+        assert calls == [1, 0]
+
+
+def _invalidations(graph, node):
+    """Return a list which collects the invalidations of node."""
+
+    invalidations = []
+
+    def listener(event):
+        if (event.node is node
+                and event.new_state is Node.State.INVALID):
+            invalidations.append(event)
+
+    graph.listeners[NodeStateEvent].add(listener)
+    return invalidations
+
+
+def test_replacing_args_is_a_single_diffed_mutation(graph):
+    xs = [VarNode(i) for i in range(1000)]
+    total = AddNode(*xs)
+    assert total.value == sum(range(1000))
+    mutations = []
+    total.args.listeners.add(mutations.append)
+    invalidations = _invalidations(graph, total)
+    version = graph._structure_version
+
+    new = VarNode(-1)
+    total.args = xs[:500] + [new] + xs[501:]
+    assert len(mutations) == 1
+    assert (mutations[0].index, mutations[0].removed,
+            mutations[0].added) == (500, [xs[500]], [new])
+    assert len(invalidations) == 1
+    assert graph._structure_version == version + 1
+    assert xs[500]._dependents == set()
+    assert total.value == sum(range(1000)) - 501
+
+    total.args = list(total.args)
+    assert len(mutations) == 1
+    assert graph._structure_version == version + 1
+
+
+@pytest.mark.parametrize("observed", [False, True])
+def test_replacing_args_invalidates_at_most_once(graph, observed):
+    xs = [VarNode(i) for i in range(100)]
+    total = AddNode(*xs)
+    if observed:
+        total.args
+    total.value
+    invalidations = _invalidations(graph, total)
+    added = []
+    removed = []
+    graph.listeners[NodeArgAddEvent].add(added.append)
+    graph.listeners[NodeArgRemoveEvent].add(removed.append)
+
+    ys = [VarNode(-i) for i in range(100)]
+    total.args = ys
+    assert len(invalidations) == 1
+    assert [e.arg for e in added] == ys
+    assert [e.arg for e in removed] == xs
+    assert total.value == -sum(range(100))
+
+    total.args = tuple(ys)
+    assert len(invalidations) == 1
+    assert total.state is Node.State.VALID
+
+
+@pytest.mark.parametrize("observed", [False, True])
+def test_replacing_kwargs_only_reports_changed_items(graph, observed):
+    a, b, c = VarNode(1), VarNode(2), VarNode(3)
+    node = FuncNode(lambda a, b: a - b, a=a, b=b)
+    if observed:
+        node.kwargs
+    assert node.value == -1
+    invalidations = _invalidations(graph, node)
+    added = []
+    removed = []
+    graph.listeners[NodeArgAddEvent].add(added.append)
+    graph.listeners[NodeArgRemoveEvent].add(removed.append)
+
+    node.kwargs = {**node.kwargs, "b": c}
+    assert len(invalidations) == 1
+    assert [e.arg for e in added] == [c]
+    assert [e.arg for e in removed] == [b]
+    assert node.value == -2
+
+    node.kwargs = dict(node.kwargs)
+    assert len(invalidations) == 1
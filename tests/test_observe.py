@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from lameflow import (
+        AddNode, AsyncFuncNode, Batch, ConstNode, DivNode, MulNode, VarNode)
+
+
+def test_callbacks_receive_changed_values():
+    x = VarNode(1)
+    total = AddNode(x, x)
+    seen = []
+    total.observe(seen.append)
+    x.value = 2
+    x.value = 2
+    with Batch():
+        x.value = 3
+        x.value = 4
+    assert seen == [4, 8]
+    total.unobserve(seen.append)
+    x.value = 5
+    assert seen == [4, 8]
+
+
+def test_failing_observed_node_does_not_skip_others():
+    x = VarNode(1.0)
+    inverse = DivNode(ConstNode(1.0), x)
+    double = MulNode(ConstNode(2.0), x)
+    seen = []
+    inverse.observe(seen.append)
+    double.observe(seen.append)
+    with pytest.raises(ZeroDivisionError):
+        x.value = 0.0
+    assert x.value == 0.0
+    assert seen == [0.0]
+    x.value = 4.0
+    assert seen == [0.0, 0.25, 8.0]
+
+
+def test_several_failures_are_grouped():
+    x = VarNode(1)
+    first = AddNode(x, x)
+    second = MulNode(x, x)
+
+    def fail(value):
+        raise ValueError(value)
+
+    first.observe(fail)
+    second.observe(fail)
+    with pytest.raises(ExceptionGroup) as info:
+        x.value = 3
+    assert sorted(e.args[0] for e in info.value.exceptions) == [6, 9]
+
+
+async def double(x):
+    return x * 2
+
+
+def test_observed_async_nodes_are_updated_by_tasks():
+    x = VarNode(1)
+    node = AsyncFuncNode(double, x)
+    seen = []
+    node.observe(seen.append)
+    x.value = 2
+    assert seen == []
+
+    async def main():
+        x.value = 3
+        x.value = 4
+        for _ in range(10):
+            await asyncio.sleep(0)
+        return seen
+
+    assert asyncio.run(main()) == [8]
+    assert asyncio.run(node.avalue()) == 8
+
+
+def test_observed_async_node_errors_go_to_the_loop():
+    x = VarNode(1)
+    node = AsyncFuncNode(double, x)
+    errors = []
+
+    def fail(value):
+        raise ValueError(value)
+
+    node.observe(fail)
+
+    async def main():
+        asyncio.get_running_loop().set_exception_handler(
+                lambda loop, context: errors.append(context["exception"]))
+        x.value = 5
+        for _ in range(10):
+            await asyncio.sleep(0)
+
+    asyncio.run(main())
+    assert [e.args for e in errors] == [(10,)]
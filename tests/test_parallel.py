@@ -0,0 +1,48 @@
+import threading
+
+from lameflow import AddNode, FuncNode, Graph, VarNode, parallel_value
+
+
+def test_concurrent_reads_wait_for_parallel_value(graph):
+    started = threading.Event()
+    go = threading.Event()
+    calls = []
+
+    def slow(x):
+        calls.append(x)
+        started.set()
+        assert go.wait(10)
+        return x * 2
+
+    x = VarNode(1)
+    doubled = FuncNode(slow, x)
+    total = AddNode(doubled, x)
+
+    def read(results, compute):
+        with graph:
+            results.append(compute())
+
+    results = []
+    scheduler = threading.Thread(target=read,
+            args=(results, lambda: parallel_value(total, max_workers=2)))
+    scheduler.start()
+    assert started.wait(10)
+    reader = threading.Thread(target=read,
+            args=(results, lambda: doubled.value))
+    reader.start()
+    reader.join(0.1)
+    assert reader.is_alive()
+    go.set()
+    scheduler.join(10)
+    reader.join(10)
+    assert sorted(results) == [2, 3]
+    assert calls == [1]
+
+
+def test_parallel_value_in_lazy_graph():
+    with Graph(lazy=True):
+        x = VarNode(1)
+        total = AddNode(AddNode(x, x), x)
+        assert parallel_value(total) == 3
+        x.value = 2
+        assert parallel_value(total) == 6
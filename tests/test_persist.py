@@ -0,0 +1,112 @@
+import functools
+import os
+import subprocess
+import sys
+
+from lameflow import FuncNode, PersistentCache, VarNode
+from lameflow.persist import _value_fingerprint
+
+
+def make_scale(k):
+    return lambda x: x * k
+
+
+def test_closures_are_fingerprinted(graph, tmp_path):
+    graph.cache = PersistentCache(tmp_path / "values.db")
+    v = VarNode(1)
+    assert FuncNode(make_scale(2), v).value == 2
+    assert FuncNode(make_scale(3), v).value == 3
+
+
+def test_defaults_are_fingerprinted(graph, tmp_path):
+    graph.cache = PersistentCache(tmp_path / "values.db")
+    v = VarNode(1)
+    assert FuncNode(lambda x, k=5: x + k, v).value == 6
+    assert FuncNode(lambda x, k=7: x + k, v).value == 8
+
+
+def test_unfingerprintable_closures_are_not_cached(graph, tmp_path):
+    graph.cache = PersistentCache(tmp_path / "values.db")
+    file = open(os.devnull)
+    try:
+        node = FuncNode(lambda x: (file, x)[1], VarNode(1))
+        assert node.value == 1
+    finally:
+        file.close()
+    assert graph.cache.misses == 0
+    assert graph.cache.hits == 0
+
+
+SCRIPT = """
+import sys
+from lameflow import *
+
+with Graph(cache=PersistentCache(sys.argv[1])) as graph:
+    s = VarNode({3, 1, "a", "b", frozenset({"x", "y"})})
+    FuncNode(len, s).value
+    FuncNode(lambda x: x in {"p", "q", "r"}, ConstNode("p")).value
+    print(graph.cache.hits)
+"""
+
+
+def test_sets_have_the_same_fingerprint_in_every_process(tmp_path):
+    path = str(tmp_path / "values.db")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    hits = []
+    for seed in ("1", "2"):
+        env = dict(os.environ, PYTHONHASHSEED=seed, PYTHONPATH=root)
+        result = subprocess.run([sys.executable, "-c", SCRIPT, path],
+                env=env, capture_output=True, text=True, check=True)
+        hits.append(int(result.stdout))
+    assert hits == [0, 2]
+
+
+def add(x, k):
+    return x + k
+
+
+def test_callables_without_names_are_cached(graph, tmp_path):
+    graph.cache = PersistentCache(tmp_path / "values.db")
+    node = FuncNode(functools.partial(add, k=1), VarNode(1))
+    assert node.value == 2
+    assert graph.cache.misses == 1
+    graph.cache.invalidate(functools.partial)
+    assert graph.cache._bytes == 0
+
+
+def scale(x, k):
+    return x * k
+
+
+class Scaler:
+    def __init__(self, k):
+        self.k = k
+
+    def __call__(self, x):
+        return x * self.k
+
+
+def test_code_of_callable_objects_is_fingerprinted():
+    def changed(x, k):
+        return x
+
+    cases = [
+        (functools.partial(scale, k=2), scale),
+        (Scaler(2), Scaler.__call__),
+    ]
+    for func, code_owner in cases:
+        before = _value_fingerprint(func)
+        assert before is not None
+        old_code = code_owner.__code__
+        code_owner.__code__ = changed.__code__.replace(
+                co_name=old_code.co_name,
+                co_qualname=old_code.co_qualname)
+        try:
+            assert _value_fingerprint(func) != before
+        finally:
+            code_owner.__code__ = old_code
+        assert _value_fingerprint(func) == before
+
+    assert (_value_fingerprint(functools.partial(scale, k=2))
+            != _value_fingerprint(functools.partial(scale, k=3)))
+    assert _value_fingerprint(Scaler(2)) != _value_fingerprint(Scaler(3))
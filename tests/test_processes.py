@@ -0,0 +1,28 @@
+import asyncio
+
+import pytest
+
+from lameflow import AsyncFuncNode, FuncNode, VarNode, process_value
+
+
+def square(x):
+    return x * x
+
+
+async def add_one(x):
+    return x + 1
+
+
+def test_process_value_computes_in_workers():
+    x = VarNode(3)
+    total = FuncNode(square, FuncNode(square, x))
+    assert process_value(total, max_workers=2) == 81
+    x.value = 2
+    assert process_value(total, max_workers=2) == 16
+
+
+def test_process_value_rejects_async_nodes():
+    node = AsyncFuncNode(add_one, VarNode(1))
+    with pytest.raises(TypeError, match="avalue"):
+        process_value(node, max_workers=1)
+    assert asyncio.run(node.avalue()) == 2
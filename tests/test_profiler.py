@@ -0,0 +1,80 @@
+import csv
+import io
+import json
+import time
+
+from lameflow import AddNode, FuncNode, Profiler, VarNode
+
+
+def slow(x):
+    time.sleep(0.02)
+    return x + 1
+
+
+def test_cumulative_time_includes_arguments():
+    x = VarNode(0)
+    first = FuncNode(slow, x)
+    second = FuncNode(slow, first)
+    third = FuncNode(slow, second)
+    with Profiler() as profiler:
+        assert third.value == 3
+    stats = profiler.nodes[third]
+    assert 0.02 <= stats.exclusive < 0.04
+    assert stats.cumulative >= 0.06
+    assert profiler.nodes[first].cumulative < 0.04
+
+
+def test_top_and_last_cause():
+    x = VarNode(1)
+    y = VarNode(2)
+    total = AddNode(x, y)
+    result = FuncNode(slow, total)
+    with Profiler() as profiler:
+        result.value
+        result.value
+        y.value = 3
+        result.value
+    rows = profiler.top(2)
+    assert [row["name"] for row in rows][0] == str(result)
+    assert len(rows) == 2
+    stats = profiler.nodes[result]
+    assert (stats.hits, stats.recomputes, stats.invalidations) == (1, 2, 1)
+    assert stats.last_cause == "argument 0 (AddNode) changed"
+    assert profiler.nodes[total].last_cause == (
+            "argument 1 (VarNode) changed")
+
+    classes = {row["name"]: row for row in profiler.rows(per="class")}
+    assert classes["FuncNode"]["recomputes"] == 2
+    assert classes["AddNode"]["recomputes"] == 2
+
+
+def test_export(tmp_path):
+    x = VarNode(1)
+    result = FuncNode(slow, x)
+    with Profiler() as profiler:
+        result.value
+
+    file = io.StringIO()
+    profiler.to_csv(file)
+    rows = list(csv.DictReader(io.StringIO(file.getvalue())))
+    assert rows[0]["name"] == str(result)
+    assert rows[0]["recomputes"] == "1"
+    assert rows[0]["last_cause"] == "first computation"
+
+    path = tmp_path / "profile.json"
+    profiler.to_json(path, per="class")
+    rows = json.loads(path.read_text())
+    assert rows[0]["name"] == "FuncNode"
+    assert set(rows[0]) == {"name", "class", *Profiler.fields}
+
+
+def test_disabled_profiler_records_nothing():
+    x = VarNode(1)
+    result = FuncNode(slow, x)
+    profiler = Profiler()
+    result.value
+    with profiler:
+        pass
+    x.value = 2
+    result.value
+    assert profiler.nodes == {}
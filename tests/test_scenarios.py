@@ -0,0 +1,74 @@
+import pytest
+
+from lameflow import (
+        AddNode, ConstNode, DivNode, FuncNode, MulNode, PowNode, VarNode,
+        evaluate_scenarios)
+import lameflow.scenarios
+
+
+def test_float_inputs_are_vectorized(monkeypatch):
+    pytest.importorskip("numpy")
+
+    def fail(*args):
+        raise AssertionError("Scenarios were computed one at a time.")
+
+    monkeypatch.setattr(lameflow.scenarios, "_looped", fail)
+    x, y = VarNode(1.0), VarNode(2.0)
+    node = AddNode(MulNode(x, y), PowNode(x, ConstNode(2.0)))
+    result = evaluate_scenarios(node, {x: [1.0, 2.0, 3.0],
+            y: [0.5, 0.5, 1.0]})
+    assert result == [1.5, 5.0, 12.0]
+    assert all(type(value) is float for value in result)
+    assert node.value == 3.0
+
+
+def test_errors_fall_back_to_python_semantics():
+    x = VarNode(1.0)
+    node = DivNode(ConstNode(1.0), x)
+    assert evaluate_scenarios(node, {x: [1.0, 4.0]}) == [1.0, 0.25]
+    with pytest.raises(ZeroDivisionError):
+        evaluate_scenarios(node, {x: [1.0, 0.0, 2.0]})
+    assert x.value == 1.0
+
+
+def test_int_inputs_stay_python_ints():
+    x = VarNode(1)
+    node = MulNode(AddNode(x, ConstNode(1)), ConstNode(10 ** 20))
+    result = evaluate_scenarios(node, {x: [1, 2]})
+    assert result == [2 * 10 ** 20, 3 * 10 ** 20]
+    assert all(type(value) is int for value in result)
+
+
+def label(x, prefix, **extra):
+    return f"{prefix}{x}{extra.get('not an identifier', '')}"
+
+
+def test_func_node_keyword_arguments():
+    x = VarNode(1)
+    prefix = VarNode("a")
+    node = FuncNode(label, x, prefix=prefix,
+            **{"not an identifier": ConstNode("!")})
+    result = evaluate_scenarios([node, x], {x: [1, 2], prefix: ["p", "q"]})
+    assert result == [("p1!", 1), ("q2!", 2)]
+    assert node.value == "a1!"
+
+
+def test_independent_nodes_are_computed_once():
+    calls = []
+
+    def expensive(v):
+        calls.append(v)
+        return v * 10
+
+    x, y = VarNode(1), VarNode(2)
+    constant = FuncNode(expensive, y)
+    result = evaluate_scenarios([AddNode(x, constant), constant],
+            {x: [1, 2, 3]})
+    assert result == [(21, 20), (22, 20), (23, 20)]
+    assert calls == [2]
+
+
+def test_inputs_must_have_the_same_length():
+    x, y = VarNode(1), VarNode(2)
+    with pytest.raises(ValueError):
+        evaluate_scenarios(AddNode(x, y), {x: [1, 2], y: [1]})
@@ -0,0 +1,134 @@
+import pytest
+
+from lameflow import (
+        AddNode, ConstNode, FuncNode, Graph, MulNode, Node, UnboundedMemo,
+        VarNode, load_snapshot, nodeclass, save_snapshot)
+
+
+calls = []
+
+
+def record(x):
+    calls.append(x)
+    return x * 10
+
+
+@nodeclass
+class Scaled(Node):
+    __slots__ = ("factor", "__secret")
+
+    def __init__(self, x, factor):
+        super().__init__(x)
+        self.factor = factor
+        self.__secret = factor + 1
+
+    @staticmethod
+    def key(cls, x, factor):
+        return (cls, x, factor)
+
+    def compute_value(self, x):
+        return x.value * self.factor + self.__secret
+
+
+def build():
+    x = VarNode(2, __name="x")
+    total = AddNode(x, ConstNode(1), __name="total")
+    recorded = FuncNode(record, total, __name="recorded")
+    scaled = Scaled(total, 3, __name="scaled")
+    other = MulNode(ConstNode(5), ConstNode(6), __name="other")
+    for node in (recorded, scaled, other):
+        node.value
+    return x, total, recorded, scaled, other
+
+
+def test_save_and_load(tmp_path):
+    path = tmp_path / "graph.snap"
+    with Graph():
+        build()
+        save_snapshot(path)
+    del calls[:]
+
+    with Graph() as graph:
+        nodes = {node.name: node for node in load_snapshot(path)}
+        recorded = nodes["recorded"]
+        assert recorded.state is Node.State.VALID
+        assert recorded.value == 30
+        assert nodes["scaled"].value == 13
+        assert nodes["scaled"].factor == 3
+        assert nodes["other"].value == 30
+        assert calls == []
+
+        # Restored Nodes are memoized and linked to their arguments.
+        x = nodes["x"]
+        assert FuncNode(record, nodes["total"]) is recorded
+        x.value = 4
+        assert recorded.value == 50
+        assert nodes["scaled"].value == 19
+        assert calls == [5]
+        assert graph.memo.hits > 0
+
+
+def test_partial_restore(tmp_path):
+    path = tmp_path / "graph.snap"
+    with Graph():
+        build()
+        save_snapshot(path)
+
+    with Graph():
+        nodes = load_snapshot(path, roots=["total"])
+        assert [node.name for node in nodes if node.name] == ["x", "total"]
+        assert nodes[-1].value == 3
+        with pytest.raises(KeyError):
+            load_snapshot(path, roots=["missing"])
+
+
+def test_var_nodes_get_new_keys_and_memoized_nodes_are_reused(tmp_path):
+    path = tmp_path / "graph.snap"
+    with Graph():
+        build()
+        save_snapshot(path)
+
+    with Graph():
+        existing = VarNode(0)
+        other = MulNode(ConstNode(5), ConstNode(6))
+        loaded = load_snapshot(path)
+        x = next(node for node in loaded if node.name == "x")
+        assert x.key != existing.key
+        assert VarNode(0).key not in (x.key, existing.key)
+        assert other in loaded
+        assert other.name is None
+
+
+def test_outdated_nodes_are_saved_as_invalid(tmp_path):
+    path = tmp_path / "graph.snap"
+    with Graph(lazy=True):
+        x, total, recorded, scaled, other = build()
+        x.value = 7
+        save_snapshot(path)
+    del calls[:]
+
+    with Graph():
+        nodes = {node.name: node for node in load_snapshot(path)}
+        assert nodes["x"].value == 7
+        assert nodes["recorded"].state is Node.State.INVALID
+        assert nodes["recorded"].value == 80
+        assert calls == [8]
+
+
+class StaleMemo(UnboundedMemo):
+    """A memo which, like a weak memo, may lose a Node while it is
+    iterated.
+    """
+
+    def __iter__(self):
+        yield ("freed",)
+        yield from super().__iter__()
+
+
+def test_save_with_a_memo_losing_nodes(tmp_path):
+    path = tmp_path / "graph.snap"
+    with Graph(memo=StaleMemo()):
+        build()
+        save_snapshot(path)
+    with Graph():
+        assert len(load_snapshot(path)) == 9
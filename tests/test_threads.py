@@ -0,0 +1,65 @@
+import random
+import threading
+
+import pytest
+
+from lameflow import ConstNode, FuncNode, Graph, VarNode, parallel_value
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_concurrent_reads(lazy):
+    rnd = random.Random(0)
+    calls = []
+    lock = threading.Lock()
+
+    def combine(a, b, tag):
+        with lock:
+            calls.append(tag)
+        return a + b
+
+    threads = 4
+    barrier = threading.Barrier(threads + 1, timeout=30)
+    errors = []
+
+    with Graph(lazy=lazy) as graph:
+        inputs = [VarNode(rnd.randint(0, 9)) for _ in range(6)]
+        nodes = list(inputs)
+        for i in range(100):
+            a, b = rnd.sample(nodes[-20:], 2)
+            nodes.append(FuncNode(combine, a, b, tag=ConstNode(i)))
+        rounds = [[rnd.randint(0, 9) for _ in inputs] for _ in range(20)]
+
+        def reader(i):
+            reader_rnd = random.Random(i)
+            with graph:
+                for _ in rounds:
+                    barrier.wait()
+                    try:
+                        for node in reader_rnd.sample(nodes, len(nodes)):
+                            if i == 0:
+                                parallel_value(node, max_workers=2)
+                            else:
+                                node.value
+                    except BaseException as e:
+                        errors.append(e)
+                    barrier.wait()
+
+        workers = [threading.Thread(target=reader, args=(i,))
+                for i in range(threads)]
+        for worker in workers:
+            worker.start()
+        for values in rounds:
+            for node, value in zip(inputs, values):
+                node.value = value
+            del calls[:]
+            barrier.wait()
+            barrier.wait()
+            # No Node was computed twice for the same input values.
+            assert len(calls) == len(set(calls))
+            for node in nodes[len(inputs):]:
+                a, b = node.args
+                assert node.value == a.value + b.value
+        for worker in workers:
+            worker.join()
+
+    assert not errors